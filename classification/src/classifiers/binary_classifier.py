@@ -203,3 +203,9 @@ class BinaryClassifier:
     def predict(self, text):
         raise Exception("Implementation missing")
         pass
+
+    def predict_batch(self, texts):
+        """
+        Predicts a list of strings, sub classes override this with a faster implementation
+        """
+        return [self.predict(text) for text in texts]
@@ -70,6 +70,20 @@ class FasttextClassifier(BinaryClassifier):
         # return prediction
         return p[1][j]
 
+    def predict_batch(self, texts):
+        """
+        Predicts the probabilities of a list of strings being of the dedicated label
+        """
+        # load model if none present
+        if type(self.model) == bytes:
+            self.load_model()
+        result = []
+        for labels, probabilities in zip(*self.model.predict(texts, k=-1)):
+            j = 1 if labels[0] == '__label__other' else 0
+            # the probabilities of a list are single precision, convert like a single prediction
+            result.append(np.float64(probabilities[j]))
+        return result
+
     def save_model(self, f):
         """
         Exports model to a file
@@ -21,5 +21,8 @@ class J48Classifier(ScikitClassifier):
         prediction = self.model.predict(self.data_vectorizer.transform([text]).toarray())
         return prediction[0]
 
+    def predict_vectors(self, vectors):
+        return list(self.model.predict(vectors))
+
 
 
@@ -19,3 +19,7 @@ class LRClassifier(ScikitClassifier):
     def predict(self, text):
         prediction = self.model.predict_proba(self.data_vectorizer.transform([text]).toarray())
         return prediction[0][1]
+
+    def predict_vectors(self, vectors):
+        # row by row, a matrix product over the whole batch rounds differently than the single predictions
+        return [self.model.predict_proba(vectors[i:i + 1])[0][1] for i in range(len(vectors))]
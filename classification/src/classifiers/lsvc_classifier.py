@@ -20,3 +20,7 @@ class LSVCClassifier(ScikitClassifier):
         prediction = self.model.decision_function(self.data_vectorizer.transform([text]).toarray())
         return prediction[0]
 
+    def predict_vectors(self, vectors):
+        # row by row, a matrix product over the whole batch rounds differently than the single predictions
+        return [self.model.decision_function(vectors[i:i + 1])[0] for i in range(len(vectors))]
+
@@ -21,3 +21,6 @@ class RFClassifier(ScikitClassifier):
         prediction = self.model.predict_proba(self.data_vectorizer.transform([text]).toarray())
         return prediction[0][1]
 
+    def predict_vectors(self, vectors):
+        return list(self.model.predict_proba(vectors)[:, 1])
+
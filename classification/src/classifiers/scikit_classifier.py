@@ -34,6 +34,12 @@ class ScikitClassifier(BinaryClassifier):
         # write training data
         self.train_dataset = (x, y)
 
+    def predict_batch(self, texts):
+        """
+        Vectorizes a list of strings at once and predicts them
+        """
+        return self.predict_vectors(self.data_vectorizer.transform(texts).toarray())
+
     def save_model(self, f):
         """
         save model with pickle
@@ -53,3 +59,7 @@ class ScikitClassifier(BinaryClassifier):
     def predict(self, text):
         raise Exception("Implementation missing")
         pass
+
+    def predict_vectors(self, vectors):
+        raise Exception("Implementation missing")
+        pass
@@ -57,6 +57,15 @@ class Predictor:
                     p = pickle.load(f)
                     self.classifiers.append(p)
 
+    def load_models(self):
+        """
+        Loads the models that classifiers only load on their first prediction, so processes forked afterwards share
+        them instead of loading them again.
+        """
+        for classifier in self.classifiers:
+            if type(classifier.model) == bytes:
+                classifier.load_model()
+
     def predict(self, text, verbose):
         """
         Predicts label using models.
@@ -71,6 +80,23 @@ class Predictor:
                 predictions[classifier.label] = classifier.predict(text)
         return predictions if verbose > 0 else (max(predictions, key=predictions.get), max(predictions.values()))
 
+    def predict_batch(self, texts, verbose):
+        """
+        Predicts the labels of a list of texts using models, each classifier is called once for the whole list.
+        Args:
+            texts: List of texts that one wants to predict the labels of
+            verbose: Argument if not only the predicted labels should be returned, but also their probabilities.
+        Returns: list of predictions with or without probability, in the order of texts.
+        """
+        predictions = [{} for _ in texts]
+        with parallel_backend('threading', n_jobs=-1):
+            for classifier in self.classifiers:
+                for prediction, score in zip(predictions, classifier.predict_batch(texts)):
+                    prediction[classifier.label] = score
+        if verbose > 0:
+            return predictions
+        return [(max(p, key=p.get), max(p.values())) for p in predictions]
+
 
 def main(models, text, verbose):
     """
@@ -0,0 +1,423 @@
+"""
+Copyright (c) 2021 Tim Moser.
+
+This file is part of coality
+(see https://github.com/TimDeanMoser/coality).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Benchmarks and comparisons for the performance critical parts of the pipeline. Prints the results to console.
+For a smooth performance, make sure that the root of the repository is the working directory when running the script and use absolute paths as the arguments.
+
+Example:
+    $ python benchmark.py parity C:\\my_project
+    $ python benchmark.py parity
+    $ python benchmark.py missing
+    $ python benchmark.py tokenizer
+    $ python benchmark.py coherence
+    $ python benchmark.py startup -models C:\\my_models
+"""
+
+import argparse
+import io
+import logging
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from quality_assessment.src.comment_object import Comment
+from quality_assessment.src.comment_scraper import CommentScraper, iter_units
+from quality_assessment.src import tokenizer
+from quality_assessment.src.comment_rater import get_coherence_coefficient, get_handle_matcher, split_camel_case
+
+SRCML_TEMPLATE = ('<unit xmlns="http://www.srcML.org/srcML/src" xmlns:pos="http://www.srcML.org/srcML/position">'
+                  '<unit filename="Benchmark.java" language="Java">%s</unit></unit>')
+"""srcML archive holding a single file for the synthetic benchmarks"""
+
+PARITY_CASES = {
+    "HeaderInclude.cpp": "/* License */\n#include <vector>\n#ifdef DEBUG\n#define LOG 1\n#endif\nclass Parser {\n"
+                         "    void parse() {}\n    // Resets the parser.\n    void reset() {}\n    void close() {}\n};\n",
+    "Box.java": "public class Box<T> {\n    // Returns the value.\n    public Map<String, T> getValue(int x) {\n        return null;\n    }\n"
+                "    public List<? extends T> getItems() {\n        return null;\n    }\n}\n",
+    "E.cpp": "int a() {\n    return 0;\n}\nstd::map<int, int> b() {\n    return {};\n}\n"
+             "std::pair<int, long> c(int x) {\n    return {};\n}\n",
+}
+"""Source files scraped by the parity comparison when no project is given, cases the backends have disagreed on"""
+
+STARTUP_MODULES = ["quality_assessment.src.comment_rater", "quality_assessment.src.comment_scraper",
+                   "quality_assessment.src.main"]
+"""Modules whose import time is measured by the startup benchmark"""
+
+FIRST_COMMENT = ("from quality_assessment.src.comment_rater import Rater\n"
+                 "from quality_assessment.src.comment_object import Comment\n"
+                 "Rater(%r).rate([Comment(0, './A.java', '1:1', 'function', '// Returns the value.', 'getValue', 'Java')])")
+"""Script rating a single comment, from the imports to the loaded models"""
+
+
+def parity(project: str = None) -> dict:
+    """
+    Scrape a project with the srcML and the lexer backend and compare the found and missing comments.
+    Found comments are matched by file and position, missing comments by file, position and type.
+
+    Args:
+        project: Path to directory of project to scrape, None for the files of PARITY_CASES.
+
+    Returns:
+        Dict with the run time of both backends and the number of matching and differing comments.
+    """
+    if project is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, source in PARITY_CASES.items():
+                with open(os.path.join(tmp, name), "w", encoding="UTF-8", newline="") as f:
+                    f.write(source)
+            return parity(tmp)
+    results = {}
+    for backend in ("srcml", "lexer"):
+        start = time.perf_counter()
+        results[backend] = CommentScraper(backend=backend).get_directory_comments(project)
+        results[backend + "_seconds"] = time.perf_counter() - start
+    srcml = {(c.path, c.line): c for c in results["srcml"]["comments"]}
+    lexer = {(c.path, c.line): c for c in results["lexer"]["comments"]}
+    both = srcml.keys() & lexer.keys()
+    srcml_missing = {(m["file"], m["pos"], m["type"]) for m in results["srcml"]["missing_comments"]}
+    lexer_missing = {(m["file"], m["pos"], m["type"]) for m in results["lexer"]["missing_comments"]}
+    return {
+        "srcml_seconds": results["srcml_seconds"],
+        "lexer_seconds": results["lexer_seconds"],
+        "comments_both": len(both),
+        "comments_only_srcml": len(srcml.keys() - lexer.keys()),
+        "comments_only_lexer": len(lexer.keys() - srcml.keys()),
+        "different_text": sum(1 for k in both if srcml[k].text != lexer[k].text),
+        "different_type": sum(1 for k in both if srcml[k].type != lexer[k].type),
+        "different_handle": sum(1 for k in both if srcml[k].handle != lexer[k].handle),
+        "missing_both": len(srcml_missing & lexer_missing),
+        "missing_only_srcml": len(srcml_missing - lexer_missing),
+        "missing_only_lexer": len(lexer_missing - srcml_missing),
+    }
+
+
+def nested_classes(depth: int, members: int) -> str:
+    """
+    Helper to generate srcML of classes nested into each other, each one lacking a comment and holding a number of
+    commented and uncommented functions.
+
+    Args:
+        depth: Number of nested classes.
+        members: Number of functions in every class.
+
+    Returns:
+        srcML document as string.
+    """
+    body = ""
+    for level in range(depth, 0, -1):
+        functions = "".join('<comment type="line" pos:start="%d:5">// function %d</comment>'
+                            '<function pos:start="%d:5"><name>f%d</name><block>{<expr_stmt>x;</expr_stmt>}</block>'
+                            '</function><function pos:start="%d:5"><name>g%d</name><block>{}</block></function>'
+                            % (level, m, level, m, level, m) for m in range(members))
+        body = '<expr_stmt>x;</expr_stmt><class pos:start="%d:1"><name>C%d</name><block>{%s%s}</block></class>' % (
+            level, level, functions, body)
+    return SRCML_TEMPLATE % body
+
+
+def missing(depths: list, sizes: list) -> dict:
+    """
+    Time the detection of found and missing comments on nested classes of growing depth and size.
+    Linear scaling shows as a constant time per element.
+
+    Args:
+        depths: List of nesting depths to time.
+        sizes: List of numbers of functions per class to time.
+
+    Returns:
+        Dict with the microseconds per srcML element of each depth and size.
+    """
+    results = {}
+    for depth in depths:
+        for size in sizes:
+            document = nested_classes(depth, size).encode()
+            elements = document.count(b"</")
+            unit = next(iter_units(io.BytesIO(document)))
+            scraper = CommentScraper()
+            start = time.perf_counter()
+            scraper.scrape_unit(unit, [], [])
+            seconds = time.perf_counter() - start
+            results["depth %d, size %d" % (depth, size)] = seconds / elements * 1e6
+    return results
+
+
+def legacy_stats(line: str) -> tuple:
+    """
+    The tokenizer before the rewrite, concatenating the syllable list word by word.
+
+    Args:
+        line: Processed text of a comment.
+
+    Returns:
+        Tuple of the lists of words, complex words, sentences and syllables.
+    """
+    import nltk
+    raw_words = re.findall(tokenizer.WORD_PAT, line.lower().strip())
+    words = list(filter(lambda word: not (
+            not re.search(tokenizer.VOWELS, word) or (
+                word.find("-") > 0 and not re.search(tokenizer.VALID_HYPHENS, word))), raw_words))
+    sentences = nltk.sent_tokenize(line)
+    syllables = []
+    complex_words = []
+    for word in words:
+        syl = re.findall(tokenizer.SYLLABLES, word.lower())
+        if len(syl) > 1 and syl[-1] == "e":
+            tmp = syl[0:-2]
+            tmp.append(syl[-2] + 'e')
+            syl = tmp
+        syllables = syllables + syl
+        if len(syl) >= 3:
+            complex_words.append(word)
+    return words, complex_words, sentences, syllables
+
+
+def javadoc(sentences: int) -> str:
+    """
+    Helper to generate the processed text of a long Javadoc block.
+
+    Args:
+        sentences: Number of sentences.
+
+    Returns:
+        Text of the block.
+    """
+    rng = random.Random(sentences)
+    vocabulary = ["returns", "the", "value", "of", "this", "configuration", "property", "if", "it", "is", "defined",
+                  "otherwise", "default", "implementation", "throws", "exception", "when", "parameter", "invalid",
+                  "serializable", "thread-safe", "iterator", "collection", "element", "are", "ignored", "see", "also"]
+    return " ".join(" ".join(rng.choice(vocabulary) for _ in range(rng.randint(5, 25))).capitalize() + "."
+                    for _ in range(sentences))
+
+
+def tokenize(sizes: list, repeat: int) -> dict:
+    """
+    Time the legacy tokenizer against the rewritten one with lists and counting only, on Javadoc blocks of growing
+    length. All of them must agree on the counts.
+
+    Args:
+        sizes: List of numbers of sentences per block.
+        repeat: Number of times each block is tokenized.
+
+    Returns:
+        Dict with the milliseconds per block of each implementation and size.
+    """
+    results = {}
+    for size in sizes:
+        comment = Comment(0, "", "", "", "", None, "")
+        comment.processed_text = javadoc(size)
+        words, complex_words, sentences, syllables = legacy_stats(comment.processed_text)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            legacy_stats(comment.processed_text)
+        results["legacy, %d sentences" % size] = (time.perf_counter() - start) / repeat * 1000
+        for counts_only in (False, True):
+            t = tokenizer.Tokenizer(counts_only)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                t.get_stats(comment)
+            results["%s, %d sentences" % ("counts" if counts_only else "lists", size)] = (
+                    time.perf_counter() - start) / repeat * 1000
+            if (t.n_words, t.n_complex_words, t.n_sentences, t.n_syllables) != (
+                    len(words), len(complex_words), len(sentences), len(syllables)):
+                logging.error("Tokenizer counts differ from the legacy tokenizer on %d sentences", size)
+    return results
+
+
+def legacy_coherence_coefficient(words: list, look_up: str) -> float:
+    """
+    The coherence coefficient before the index, computing the levenshtein distance of every word and handle word.
+
+    Args:
+        words: list of words of a comment
+        look_up: text for comparison
+
+    Returns:
+        Coherence coefficient.
+    """
+    from Levenshtein import distance as levenshtein_distance
+    similar_words = 0
+    split_look_up = split_camel_case(look_up).lower().split()
+    for word in map(lambda x: x.lower(), words):
+        for check in split_look_up:
+            if levenshtein_distance(word, check) < 2:
+                similar_words += 1
+    return similar_words / len(words)
+
+
+def coherence(words: list, handle_words: list, repeat: int) -> dict:
+    """
+    Time the legacy coherence coefficient against the indexed one on comments and handles of growing length.
+    Both must give the same coefficient.
+
+    Args:
+        words: List of numbers of words per comment.
+        handle_words: List of numbers of camel case words per handle.
+        repeat: Number of times each coefficient is calculated.
+
+    Returns:
+        Dict with the milliseconds per coefficient of each implementation and size.
+    """
+    rng = random.Random(0)
+    vocabulary = ["get", "set", "value", "values", "name", "file", "path", "paths", "user", "users", "config", "load",
+                  "loader", "read", "reader", "cache", "cached", "index", "indices", "item", "items", "list", "map"]
+    results = {}
+    for n in words:
+        for m in handle_words:
+            comment = [rng.choice(vocabulary) for _ in range(n)]
+            handle = "".join(rng.choice(vocabulary).capitalize() for _ in range(m))
+            start = time.perf_counter()
+            for _ in range(repeat):
+                legacy = legacy_coherence_coefficient(comment, handle)
+            results["legacy, %d x %d" % (n, m)] = (time.perf_counter() - start) / repeat * 1000
+            get_handle_matcher.cache_clear()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                indexed = get_coherence_coefficient(comment, handle)
+            results["indexed, %d x %d" % (n, m)] = (time.perf_counter() - start) / repeat * 1000
+            if legacy != indexed:
+                logging.error("Coherence coefficients differ on %d words and %d handle words", n, m)
+    return results
+
+
+def run_python(code: str, repeat: int) -> float:
+    """
+    Helper to time a fresh interpreter running a script in the working directory.
+
+    Args:
+        code: Python code to run.
+        repeat: Number of runs.
+
+    Returns:
+        Milliseconds of the fastest run.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def startup(modules: list, models: str, repeat: int) -> dict:
+    """
+    Time the startup of fresh interpreters importing the modules of the pipeline, constructing a Rater and rating
+    a first comment, which loads the models.
+
+    Args:
+        modules: List of modules to import.
+        models: Path to the comment classification models directory, None to skip the rater.
+        repeat: Number of runs of every script.
+
+    Returns:
+        Dict with the milliseconds of every script.
+    """
+    results = {"interpreter": run_python("pass", repeat)}
+    for module in modules:
+        results["import " + module.rsplit(".", 1)[-1]] = run_python("import " + module, repeat)
+    if models:
+        results["rater"] = run_python("from quality_assessment.src.comment_rater import Rater\nRater(%r)" % models,
+                                      repeat)
+        results["first comment"] = run_python(FIRST_COMMENT % models, repeat)
+    return results
+
+
+def print_results(results: dict):
+    """
+    Helper to print the results of a benchmark.
+
+    Args:
+        results: Dict of result names and values.
+    """
+    for key, value in results.items():
+        print("%-24s %s" % (key, round(value, 4) if isinstance(value, float) else value))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark and compare parts of the pipeline.')
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    parity_parser = subparsers.add_parser("parity", help="Compare the comments found by the srcML and lexer backend.")
+    parity_parser.add_argument('project', metavar='Project', type=str, nargs="?", default=None,
+                               help='Path to the project directory to scrape, default: the built-in cases.')
+
+    missing_parser = subparsers.add_parser("missing", help="Time the found and missing comment detection.")
+    missing_parser.add_argument("-depths", "--depths", type=int, nargs="+", default=[1, 10, 100, 500],
+                                help="Nesting depths of the generated classes.")
+    missing_parser.add_argument("-sizes", "--sizes", type=int, nargs="+", default=[1, 10, 100],
+                                help="Number of functions in every generated class.")
+
+    tokenizer_parser = subparsers.add_parser("tokenizer", help="Time the tokenizer against its legacy version.")
+    tokenizer_parser.add_argument("-sizes", "--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                                  help="Number of sentences in every generated Javadoc block.")
+    tokenizer_parser.add_argument("-repeat", "--repeat", type=int, default=5,
+                                  help="Number of times every block is tokenized.")
+
+    coherence_parser = subparsers.add_parser("coherence", help="Time the coherence coefficient against its legacy version.")
+    coherence_parser.add_argument("-words", "--words", type=int, nargs="+", default=[10, 100, 1000],
+                                  help="Number of words in every generated comment.")
+    coherence_parser.add_argument("-handle_words", "--handle_words", type=int, nargs="+", default=[2, 8, 32],
+                                  help="Number of camel case words in every generated handle.")
+    coherence_parser.add_argument("-repeat", "--repeat", type=int, default=5,
+                                  help="Number of times every coefficient is calculated.")
+
+    startup_parser = subparsers.add_parser("startup", help="Time the imports and the startup of the rater.")
+    startup_parser.add_argument("-modules", "--modules", type=str, nargs="+", default=STARTUP_MODULES,
+                                help="Modules to import.")
+    startup_parser.add_argument("-models", "--models", type=str, default=None,
+                                help="Path to the models directory, to also time the rater and its first comment.")
+    startup_parser.add_argument("-repeat", "--repeat", type=int, default=5,
+                                help="Number of runs of every script, the fastest one counts.")
+
+    levels = {
+        'critical': logging.CRITICAL,
+        'error': logging.ERROR,
+        'warn': logging.WARNING,
+        'warning': logging.WARNING,
+        'info': logging.INFO,
+        'debug': logging.DEBUG
+    }
+    parser.add_argument("-log", "--log", default="info",
+                        help=("Provide logging level. Example --log debug', default='info'"), choices=levels.keys())
+
+    args = parser.parse_args()
+    # get and set logger level and format
+    level = levels.get(args.log.lower())
+    logging.basicConfig(format='%(asctime)s -%(levelname)s- [%(filename)s:%(lineno)d] \n \t %(message)s',
+                        level=level, stream=sys.stdout)
+    if args.benchmark == "parity":
+        print_results(parity(args.project))
+    elif args.benchmark == "missing":
+        print("microseconds per element")
+        print_results(missing(args.depths, args.sizes))
+    elif args.benchmark == "tokenizer":
+        print("milliseconds per block")
+        print_results(tokenize(args.sizes, args.repeat))
+    elif args.benchmark == "coherence":
+        print("milliseconds per coefficient")
+        print_results(coherence(args.words, args.handle_words, args.repeat))
+    elif args.benchmark == "startup":
+        print("milliseconds per interpreter")
+        print_results(startup(args.modules, args.models, args.repeat))
+
+    exit()
@@ -0,0 +1,169 @@
+"""
+Copyright (c) 2021 Tim Moser.
+
+This file is part of coality
+(see https://github.com/TimDeanMoser/coality).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import subprocess
+
+from quality_assessment.src.synonym_lexicon import LEXICON_PATH
+
+CACHE_VERSION = "2"
+"""Version of the cached data, increment whenever scraping or rating changes its output"""
+
+
+class CommentCache:
+    """
+    Persistent on-disk cache of the scraped and rated comments of a file, keyed by the hash of its content.
+    Every entry is a pickle file holding the found comment objects and the missing comments of one file.
+
+    Args:
+        path: Path to the cache directory, created if it does not exist.
+        version: Version string of the tools and models, part of every key.
+        max_size: Maximum size of the cache directory in bytes, oldest entries are evicted first.
+
+    Attributes:
+        hits: Number of files served from the cache.
+        misses: Number of files not found in the cache.
+    """
+
+    def __init__(self, path: str, version: str, max_size: int):
+        self.path = path
+        self.version = version
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+
+    def key(self, file: str) -> str:
+        """
+        Calculates the key of a file from its extension, its content and the version.
+
+        Args:
+            file: Path to the file.
+
+        Returns:
+            Hex digest of the key.
+        """
+        h = hashlib.sha256(self.version.encode())
+        # the extension decides the code language srcML parses a file as
+        h.update(os.path.splitext(file)[1].lower().encode())
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        """
+        Helper to get the path of the pickle file of a key.
+
+        Args:
+            key: Key of the entry.
+
+        Returns:
+            Path to the entry.
+        """
+        return os.path.join(self.path, key[:2], key + ".pickle")
+
+    def get(self, key: str):
+        """
+        Looks up a key in the cache.
+
+        Args:
+            key: Key of the entry.
+
+        Returns:
+            tuple of found comment objects and missing comments, None if the key is not cached.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        # mark entry as recently used for the eviction
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, found: list, missing: list):
+        """
+        Stores the comments of a file in the cache.
+
+        Args:
+            key: Key of the entry.
+            found: List of the rated comment objects of the file.
+            missing: List of the missing comments of the file.
+        """
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first so an interrupted run never leaves a broken entry
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "wb") as f:
+            pickle.dump((found, missing), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is not larger than max_size."""
+        entries = []
+        for root, dirs, files in os.walk(self.path):
+            for file in files:
+                path = os.path.join(root, file)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        size = sum(e[1] for e in entries)
+        for mtime, file_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            os.remove(path)
+            size -= file_size
+        logging.debug("Cache size after eviction: %d bytes", size)
+
+
+def get_version(models: str, backend: str = "srcml", counts_only: bool = False, cascade: bool = False) -> str:
+    """
+    Creates the version string of the cache from the cache format, the scraping backend, the rating options, the srcML
+    version and the content of the classification models and data files, so updating any of them invalidates all
+    entries.
+
+    Args:
+        models: Path to directory holding the comment classification models.
+        backend: Backend used for scraping the comments.
+        counts_only: Whether the rater only keeps the counts of the tokenizer.
+        cascade: Whether the rater skips the expensive stages for ignored comments.
+
+    Returns:
+        Hex digest of the version.
+    """
+    h = hashlib.sha256((CACHE_VERSION + backend + str(int(counts_only)) + str(int(cascade))).encode())
+    try:
+        h.update(subprocess.run(["srcml", "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout)
+    except FileNotFoundError:
+        pass
+    model_files = [os.path.join(models, f) for f in sorted(os.listdir(models)) if f.endswith(".model")]
+    data_files = [r'quality_assessment/data/lid.176.ftz', r'quality_assessment/data/abbreviations.csv']
+    if os.path.isfile(LEXICON_PATH):
+        data_files.append(LEXICON_PATH)
+    for path in model_files + data_files:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
@@ -0,0 +1,141 @@
+"""
+Copyright (c) 2021 Tim Moser.
+
+This file is part of coality
+(see https://github.com/TimDeanMoser/coality).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import logging
+import os
+import pickle
+
+CHECKPOINT_HEADER = "coality-checkpoint-1"
+"""First record of every checkpoint file, increment whenever the format of the records changes"""
+
+
+class CommentCheckpoint:
+    """
+    Append-only checkpoint of the scraped and rated comments of a run, keyed by file. The first record holds the
+    version, every following one the comments of a file. Records are only appended, a later record of a file replaces
+    an earlier one, and a run killed while writing loses at most the record being written.
+
+    Args:
+        path: Path to the checkpoint file.
+        version: Version string of the tools, models and rating options, see comment_cache.get_version.
+
+    Attributes:
+        file: The checkpoint file opened for appending, None if closed.
+    """
+
+    def __init__(self, path: str, version: str):
+        self.path = path
+        self.version = version
+        self.file = None
+
+    def load(self) -> tuple:
+        """
+        Reads the records of the checkpoint file, up to the first incomplete one.
+
+        Returns:
+            tuple of a dict of files and their (signature, found comment objects, missing comments) and the length of
+            the valid part of the file, None if there is no checkpoint of this version.
+        """
+        records = {}
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return records, None
+        with f:
+            try:
+                header = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError):
+                header = None
+            if header != (CHECKPOINT_HEADER, self.version):
+                logging.warning("The checkpoint %s is of another version, starting over.", self.path)
+                return records, None
+            end = f.tell()
+            while True:
+                try:
+                    file, signature, found, missing = pickle.load(f)
+                except EOFError:
+                    break
+                except pickle.UnpicklingError:
+                    logging.warning("Dropping the incomplete last record of the checkpoint %s.", self.path)
+                    break
+                records[file] = (signature, found, missing)
+                end = f.tell()
+        return records, end
+
+    def open(self, resume: bool) -> dict:
+        """
+        Opens the checkpoint for appending, either continuing the existing file or starting a new one.
+
+        Args:
+            resume: Whether to continue the existing checkpoint.
+
+        Returns:
+            dict of the files of the existing checkpoint and their (signature, found comment objects, missing
+            comments), empty if not resuming.
+        """
+        records, end = self.load() if resume else ({}, None)
+        if end is None:
+            self.file = open(self.path, "wb")
+            pickle.dump((CHECKPOINT_HEADER, self.version), self.file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.sync()
+        else:
+            # cut off an incomplete record before appending
+            self.file = open(self.path, "r+b")
+            self.file.truncate(end)
+            self.file.seek(end)
+        return records
+
+    def append(self, file: str, signature: tuple, found: list, missing: list):
+        """
+        Appends the comments of a file to the checkpoint.
+
+        Args:
+            file: Path to the file relative to the project.
+            signature: Signature of the file, see get_signature.
+            found: List of the rated comment objects of the file.
+            missing: List of the missing comments of the file.
+        """
+        pickle.dump((file, signature, found, missing), self.file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def sync(self):
+        """Writes the appended records through to the disk."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        """Writes the appended records through to the disk and closes the checkpoint."""
+        if self.file:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+
+def get_signature(path: str) -> tuple:
+    """
+    Helper to get the signature of a file, a checkpointed file is only resumed if it did not change since.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        tuple of size and modification time in nanoseconds.
+    """
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
@@ -28,12 +28,18 @@ Example:
 # import modules
 import argparse
 import logging
+import math
+import multiprocessing
 import os
+import posixpath
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 import numpy as np
 import pandas as pd
 import ast
+
+from quality_assessment.src.comment_exporter import read_data
 import simplejson as simplejson
 
 DF_COLUMNS: list = ["type", "path", "position", "text", "code_language", "ignore", "matched_synonyms", "abbreviations",
@@ -54,30 +60,47 @@ COLUMN_AGG: dict = {"fkgls": "mean", "frel": "mean", "fi": "mean",
 VALID_EXTENSIONS = ('.java', '.cpp', '.c', '.cc', '.cs', '.h', ".hpp")
 """Defines which file extensions must be considered in the analysis"""
 
+SHARDS_PER_WORKER = 4
+"""Number of shards of files or subtrees per worker process, so the workers stay busy until the end"""
+
+EVALUATOR = None
+"""Evaluator of the forked worker processes, inherited from the parent process"""
+
 
 class CommentEvaluator:
     """
-    Contains functions and attributes for evaluating a .csv generated by the rater class.
+    Contains functions and attributes for evaluating a .csv or .parquet generated by the rater class.
 
     Args:
-        path: Path to project directory.
-        comment_data: Path to .csv containing all found comments.
-        missing_comment_data: Path to .csv containing all missing comments.
+        path: Path to project directory the comments were scraped from, it does not need to exist anymore.
+        comment_data: Path to .csv or .parquet containing all found comments, or their pandas dataframe.
+        missing_comment_data: Path to .csv or .parquet containing all missing comments, or their pandas dataframe.
 
     Attributes:
         project_dir: Path to project directory.
         df: Main pandas dataframe that is used for calculations inside the class
+        files: Dict of the paths of the files relative to the project and the positions of their comments in df
+        rows: Array of the values of all comments in df, in the order of DF_COLUMNS
+        values: Array of the aggregated values of all comments in df as numbers, in the order of COLUMN_AGG
+        sizes: Dict of the paths of the files and directories relative to the project and their number of comments
+        children: Dict of the paths of the directories relative to the project and the paths of the files and
+            directories in them
+        aggregates: Dict of the paths of the files and directories relative to the project and their Aggregate
+        subtrees: Dict of the paths of the subtrees evaluated by worker processes and their dict and Aggregate
     """
 
     def __init__(self, path: str, comment_data: str, missing_comment_data: str):
         # save path to project
         self.project_dir: str = path
         # read found comments
-        df = pd.read_csv(comment_data)
+        df = read_data(comment_data) if isinstance(comment_data, str) else comment_data.copy()
+        # the .json holds the abbreviations as written to a .csv file, also when read from a .parquet file or a dataframe
+        df["abbreviations"] = [get_abbreviations(value) for value in df["abbreviations"]]
         # set their count to 1
         df["count"] = 1
         # read missing comments
-        df_missing = pd.read_csv(missing_comment_data)
+        df_missing = read_data(missing_comment_data) if isinstance(missing_comment_data, str) else \
+            missing_comment_data.copy()
         # label them as missing
         df_missing["count_missing"] = 1
         # label found comments as not missing
@@ -86,31 +109,38 @@ class CommentEvaluator:
         df_missing[['handle']] = df_missing[['handle']].astype(str)
         # join the two dataframes and save
         self.df: pd.DataFrame = pd.merge(df, df_missing, how='outer')
-
-    def evaluate(self, output: str, syn: int):
+        self.files: dict = {}
+        self.rows: Optional[np.ndarray] = None
+        self.values: Optional[np.ndarray] = None
+        self.sizes: dict = {}
+        self.children: dict = {}
+        self.aggregates: dict = {}
+        self.subtrees: dict = {}
+
+    def evaluate(self, output: str, syn: int, workers: int = 1):
         """
         Main function that analyzes the dataframe and generates the .json file
 
         Args:
             output: Path to project directory.
-            syn: Enable synonym analysis (0 or 1). Not recommended for large projects
+            syn: Enable synonym analysis (0 or 1).
+            workers: Number of worker processes matching the synonyms of the files and evaluating the subtrees.
         """
-        # create new columns with meta-data from the original csv's
-        self.df["is_english"] = self.df.apply(lambda row: is_english(row), axis=1)
-        self.df["is_too_short"] = self.df.apply(lambda row: is_too_short(row), axis=1)
-        self.df["is_too_long"] = self.df.apply(lambda row: is_too_long(row), axis=1)
-        self.df["is_trivial"] = self.df.apply(lambda row: is_trivial(row), axis=1)
-        self.df["is_unrelated"] = self.df.apply(lambda row: is_unrelated(row), axis=1)
-        self.df["ignore"] = self.df.apply(lambda row: is_ignore(row), axis=1)
+        # create new columns with meta-data from the original csv's, rule by rule on whole columns
+        for column, rule in FLAG_RULES.items():
+            self.df[column] = rule(self.df)
         # set certain cols to 'None' as they should not be considered when aggregating into sums/means
         self.nan_ignored_means()
         self.nan_ignored_sums()
         # evaluate the found synonyms
-        self.evaluate_synonyms(syn)
+        self.evaluate_synonyms(syn, workers)
         # drop any columns not needed
         self.df.drop(self.df.columns.difference(DF_COLUMNS), 1, inplace=True)
-        # generate the results object
-        result = self.path_to_dict(self.project_dir)
+        # group the comments by file once
+        self.group_files()
+        # generate the results object, the largest subtrees in parallel
+        self.evaluate_subtrees(workers)
+        result = self.path_to_dict("")
         # dump result as json to output file
         with open(output, 'w') as f:
             simplejson.dump(result, f, ignore_nan=True)
@@ -127,228 +157,449 @@ class CommentEvaluator:
         self.df.loc[self.df.ignore == True, 'N_abbreviations'] = np.nan
         self.df.loc[self.df.ignore == True, 'N_question'] = np.nan
 
-    def aggregate(self, path: str):
+    def group_files(self):
         """
-        Helper function to aggregate all comments that are under a certain path
+        Helper function to group the comments by file once and build the directory tree from their paths, so no file
+        or directory has to filter the whole dataframe again. Paths are compared exactly, relative to the project.
+        """
+        paths = {path: get_relative_path(path, self.project_dir) for path in self.df["path"].unique()}
+        self.files = self.df.groupby(self.df["path"].map(paths).values, sort=False).indices
+        # the comments' values in the order of the columns, fetched by position for every file
+        self.rows = self.df[DF_COLUMNS].values
+        # None and bools as numbers, NaN values are skipped by the sums and counts
+        self.values = self.df[list(COLUMN_AGG.keys())].astype(float).values
+        self.sizes = {}
+        self.children = {}
+        for file, positions in self.files.items():
+            self.sizes[file] = len(positions)
+            child = file
+            while child:
+                parent = posixpath.dirname(child)
+                self.children.setdefault(parent, set()).add(child)
+                self.sizes[parent] = self.sizes.get(parent, 0) + len(positions)
+                child = parent
+
+    def get_subtrees(self, count: int) -> list:
+        """
+        Helper function to split the tree into at least count subtrees, by replacing the largest directory with its
+        children until there are enough.
         Args:
-            path: Path to aggregate under.
+            count: Minimum number of subtrees.
 
         Returns:
-            Grouped and aggregated dataframe
+            List of the paths of the subtrees relative to the project.
+        """
+        subtrees = [""]
+        while len(subtrees) < count:
+            directories = [path for path in subtrees if path in self.children]
+            if not directories:
+                break
+            largest = max(directories, key=self.sizes.get)
+            subtrees.remove(largest)
+            subtrees += self.children[largest]
+        return subtrees
+
+    def evaluate_subtrees(self, workers: int):
         """
-        # If a comment's path does not contain the agg_path it will be filtered
-        agg_df = self.df[self.df["path"].str.contains(path, regex=False)]
-        # return one big group that is aggregated appropriately
-        return agg_df.groupby(lambda x: True).agg(COLUMN_AGG)
+        Evaluate the subtrees in a pool of forked worker processes if workers > 1, path_to_dict merges their results.
+        The workers inherit the dataframe instead of receiving it. Without fork (e.g. on Windows) the whole tree is
+        evaluated in this process.
+        Args:
+            workers: Number of worker processes.
+        """
+        global EVALUATOR
+        self.subtrees = {}
+        if workers <= 1:
+            return
+        if "fork" not in multiprocessing.get_all_start_methods():
+            logging.warning("Evaluating with several workers needs fork, evaluating in a single process.")
+            return
+        subtrees = self.get_subtrees(workers * SHARDS_PER_WORKER)
+        EVALUATOR = self
+        try:
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                # results come back in the order of the subtrees
+                self.subtrees = dict(zip(subtrees, pool.map(evaluate_subtree, subtrees)))
+        finally:
+            EVALUATOR = None
 
     def write_agg_values(self, d: dict, path: str):
         """
-        Aggregates comments under path and appends values to dict d.
+        Appends the aggregated values of all comments under path to dict d.
         Args:
             d: Dict to edit.
-            path: Path to aggregate under.
+            path: Path of the file or directory relative to the project.
         """
-        agg_df = self.aggregate(path)
-        for key in COLUMN_AGG.keys():
-            value = get_value(agg_df, key)
-            try:
-                value = int(value)
-            except:
-                pass
-            finally:
-                d[key] = value
+        d.update(self.aggregates[path].get_values())
 
     def get_file_comments(self, path: str) -> list:
         """
         Helper function to fetch all comments that are in a certain file.
         Args:
-            path: Path to file
+            path: Path of the file relative to the project.
 
         Returns:
             result: List of dicts containing the comments of a file
         """
-        # filter comments not part of the file
-        df = self.df[self.df["path"].str.contains(path, regex=False)]
-        result = []
-        # loop through filtered df and append all comments as dicts
-        for index, row in df.iterrows():
-            comment = {}
-            for key in DF_COLUMNS:
-                comment[key] = row[key]
-            result.append(comment)
-        return result
+        if path not in self.files:
+            return []
+        return [dict(zip(DF_COLUMNS, row)) for row in self.rows[self.files[path]].tolist()]
 
     def path_to_dict(self, path: str) -> Optional[dict]:
         """
-        Recursive function to generate a dict mimicking the local directory structure of a project with all directories
+        Recursive function to generate a dict mimicking the directory structure of a project with all directories
         and files containing any comments. Comments contain all their data and Files/Directories the aggregated values
-        of all comments in them
+        of all comments in them. The structure is built from the paths of the found and missing comments, so the
+        project directory does not need to exist anymore. Children are sorted by name.
+        The aggregates of the files are merged up the tree, subtrees evaluated by worker processes are merged as well.
         Args:
-            path: Path to get structure from
+            path: Path relative to the project to get structure from, '' for the project directory
 
         Returns:
             d: Dictionary containing all (aggregated) data of comments/files/directories under path
         """
+        # subtree evaluated by a worker process
+        if path in self.subtrees:
+            d, self.aggregates[path] = self.subtrees.pop(path)
+            return d
         # get filename
-        d = {'name': os.path.basename(path)}
-        # if path is a directory get all children recursively
-        if os.path.isdir(path):
-            d['structure'] = "directory"
-            # aggregate all data under directory
-            self.write_agg_values(d, path.replace("\\", "/"))
-            d['children'] = []
-            # list of all paths under directory
-            paths = [os.path.join(path, x) for x in os.listdir(path)]
-            # append all children containing at least one valid file
-            for p in paths:
-                # recursive call
-                c = self.path_to_dict(p)
-                if c is not None:
-                    d['children'].append(c)
-            if not d['children']:
-                return None
+        d = {'name': posixpath.basename(path) if path else os.path.basename(self.project_dir)}
         # path is a file
-        else:
+        if path in self.files:
+            self.aggregates[path] = get_aggregate(self.values[self.files[path]])
             # exit if not valid
             if not valid_file(path):
                 return None
             d['structure'] = "file"
             # write aggregated values of all comments in file
-            self.write_agg_values(d, path.replace("\\", "/"))
+            self.write_agg_values(d, path)
             # add comments' data as children of file
-            d["comments"] = self.get_file_comments(path.replace("\\", "/"))
+            d["comments"] = self.get_file_comments(path)
+        # if path is a directory get all children recursively
+        else:
+            d['structure'] = "directory"
+            children = []
+            aggregate = Aggregate()
+            for p in sorted(self.children.get(path, ())):
+                # recursive call
+                c = self.path_to_dict(p)
+                # merge the comments of all children, also of the ones without valid files
+                aggregate.merge(self.aggregates[p])
+                # append all children containing at least one valid file
+                if c is not None:
+                    children.append(c)
+            self.aggregates[path] = aggregate
+            # write aggregated values of all comments under directory
+            self.write_agg_values(d, path)
+            d['children'] = children
+            if not d['children']:
+                return None
         return d
 
-    def evaluate_synonyms(self, syn: int):
+    def evaluate_synonyms(self, syn: int, workers: int = 1):
         """
         Evaluate the use of synonyms in a comment on a file scope.
         Take note if the synonym of a word in a comment is used in another comment in the same file.
-        Due to its inherently high complexity it is not recommended to run this analysis on big projects.
+        The files are matched independently, spread over a pool of worker processes if workers > 1.
         Args:
             syn: Flag for enabling this analysis (0 or 1)
+            workers: Number of worker processes.
         Returns:
             Adds the matched synonyms and tracks their count in the df of this class
         """
-        self.df["matched_synonyms"] = self.df.apply(lambda x: [], axis=1)
-        self.df["N_matched_synonyms"] = self.df.apply(lambda x: 0, axis=1)
+        # a list of its own for every comment
+        self.df["matched_synonyms"] = [[] for _ in range(len(self.df))]
+        self.df["N_matched_synonyms"] = 0
         # escape if synonym analysis is disabled
         if syn == 0:
             return
-        # group comments by file, since we want to look at matches in a file scope
-        by_file = self.df.groupby('path')
-        # for every file
-        for file_name, group in by_file:
-            # for every comment in file
-            for row_index, row in group.iterrows():
-                # disregard ignored comments for evaluation
-                if row["ignore"]:
-                    continue
-                pos = row["position"]
-                # get the synonyms
-                dict = ast.literal_eval(row["synonyms"])
-                res_syn = []
-                N_syn = 0
-                # for every word in comment
-                for key in dict:
-                    # compare to every other comments' words synonyms in file
-                    for row_index2, row2 in group.iterrows():
-                        # disregard ignored comments for lookup
-                        if row2["ignore"]:
-                            continue
-                        pos2 = row2["position"]
-                        dict2 = ast.literal_eval(row2["synonyms"])
-                        # for every synonym in the look up comment
-                        for key2 in dict2:
-                            # original word in list of synonyms of another word in file
-                            if key != key2 and key in dict2[key2]:
-                                res_syn.append({
-                                    'word': key,
-                                    'synonym': key2,
-                                    'pos_word': pos,
-                                    'pos_synonym': pos2
-                                })
-                                # increment count
-                                N_syn = N_syn + 1
-                # write values to df
-                self.df.at[row_index, "N_matched_synonyms"] = N_syn
-                self.df.at[row_index, "matched_synonyms"] = res_syn
-                logging.debug(row["N_matched_synonyms"], ":", row["matched_synonyms"])
-
-
-def is_ignore(row) -> bool:
-    """
-    Helper function to determine if a comment should be ignored.
-    Headers, commented code, non-english, too short and missing comments get ignored.
+        # group the comments not ignored by file, since we want to look at matches in a file scope
+        # disregard ignored comments for evaluation and lookup
+        rows = {}
+        files = {}
+        for i, (path, pos, value, ignore) in enumerate(zip(self.df["path"], self.df["position"],
+                                                          self.df["synonyms"], self.df["ignore"])):
+            if not ignore:
+                rows.setdefault(path, []).append(i)
+                files.setdefault(path, []).append((pos, get_synonyms(value)))
+        paths = list(files)
+        size = max(1, -(-len(paths) // (max(1, workers) * SHARDS_PER_WORKER)))
+        shards = [[files[path] for path in paths[i:i + size]] for i in range(0, len(paths), size)]
+        matched = self.df["matched_synonyms"].tolist()
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            mapper = executor.map if executor else map
+            # results come back in the order of the shards
+            results = (result for shard in mapper(match_synonyms, shards) for result in shard)
+            for path, result in zip(paths, results):
+                for i, res_syn in zip(rows[path], result):
+                    matched[i] = res_syn
+        finally:
+            if executor:
+                executor.shutdown()
+        # write values to df
+        self.df["matched_synonyms"] = matched
+        self.df["N_matched_synonyms"] = [len(res_syn) for res_syn in matched]
+        logging.debug("Matched %d synonyms in %d files", self.df["N_matched_synonyms"].sum(), len(paths))
+
+
+class Aggregate:
+    """
+    Mergeable aggregate of the comments of a file or directory. Every column of COLUMN_AGG keeps the sum and the number
+    of its values that are not NaN and means are derived from them, so the aggregates of subtrees merge into the same
+    values as aggregating all comments at once. Sums are kept as their correctly rounded value and the remainder, so
+    the order of merging does not change them either.
+
+    Args:
+        rows: Number of comments.
+        sums: List of tuples of the rounded sum and the remainder of every column, in the order of COLUMN_AGG.
+        counts: List of the number of values of every column that are not NaN, in the order of COLUMN_AGG.
+    """
+
+    def __init__(self, rows: int = 0, sums: list = None, counts: list = None):
+        self.rows = rows
+        self.sums = sums or [(0.0, 0.0)] * len(COLUMN_AGG)
+        self.counts = counts or [0] * len(COLUMN_AGG)
+
+    def merge(self, other):
+        """
+        Add the comments of another aggregate, e.g. of a child.
+
+        Args:
+            other: Aggregate to merge.
+        """
+        self.rows += other.rows
+        self.sums = [add_sums(a, b) for a, b in zip(self.sums, other.sums)]
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    def get_values(self) -> dict:
+        """
+        Get the aggregated value of every column of COLUMN_AGG.
+
+        Returns:
+            Dict of the columns and their sum or mean, as int where possible. Means without values are NaN, all values
+            are None if there are no comments.
+        """
+        d = {}
+        for (key, agg), (value, _), count in zip(COLUMN_AGG.items(), self.sums, self.counts):
+            if self.rows == 0:
+                d[key] = None
+                continue
+            if agg == "mean":
+                value = value / count if count > 0 else np.nan
+            # NaN means stay NaN
+            try:
+                d[key] = int(value)
+            except (ValueError, OverflowError):
+                d[key] = value
+        return d
+
+
+def get_aggregate(values: np.ndarray) -> Aggregate:
+    """
+    Helper function to aggregate the comments of a file.
     Args:
-        row: The row of the df to evaluate.
+        values: Array of the values of the comments as numbers, in the order of COLUMN_AGG.
 
     Returns:
-        True if ignored, False otherwise.
+        Aggregate of the comments.
     """
-    return row["type"] == "header" or row["is_code"] == 1 or row["is_english"] == 0 or row["is_too_short"] == 1 or row[
-        "count_missing"] == 1
+    sums = []
+    counts = []
+    for column in values.T:
+        column = column[~np.isnan(column)].tolist()
+        value = math.fsum(column)
+        sums.append((value, math.fsum(column + [-value])))
+        counts.append(len(column))
+    return Aggregate(len(values), sums, counts)
 
 
-def is_english(row) -> int:
+def add_sums(a: tuple, b: tuple) -> tuple:
     """
-        Helper function to determine if a comment is in english (probability > 0.75).
+    Helper function to add two sums kept as their rounded value and remainder.
+    Args:
+        a: Tuple of the rounded sum and remainder.
+        b: Tuple of the rounded sum and remainder.
+
+    Returns:
+        Tuple of the rounded sum and remainder of both.
+    """
+    parts = [a[0], a[1], b[0], b[1]]
+    value = math.fsum(parts)
+    return value, math.fsum(parts + [-value])
+
+
+def evaluate_subtree(path: str) -> tuple:
+    """
+    Worker function evaluating a subtree with the inherited evaluator.
+    Args:
+        path: Path of the subtree relative to the project.
+
+    Returns:
+        Tuple of the dict of the subtree, None if it has no valid files, and its Aggregate.
+    """
+    return EVALUATOR.path_to_dict(path), EVALUATOR.aggregates[path]
+
+
+def match_synonyms(files: list) -> list:
+    """
+    Worker function matching the synonyms of the comments of every file in a shard. An inverted index of each file
+    maps every word to the synonym lists of the file containing it, so the matches of a word are looked up instead of
+    compared with every other comment.
+    Args:
+        files: list of files, each a list of tuples (position, synonyms dict) of its comments not ignored.
+
+    Returns:
+        list of files, each a list of the matched synonyms of its comments, in the order of the comments.
+    """
+    result = []
+    for comments in files:
+        # word -> (synonym, pos_synonym) of every synonym list in the file containing it, in file order
+        index = {}
+        for pos2, dict2 in comments:
+            for key2 in dict2:
+                for word in dict.fromkeys(dict2[key2]):
+                    index.setdefault(word, []).append((key2, pos2))
+        file_result = []
+        # for every word in comment
+        for pos, synonyms in comments:
+            res_syn = []
+            for key in synonyms:
+                # original word in list of synonyms of another word in file
+                for key2, pos2 in index.get(key, ()):
+                    if key != key2:
+                        res_syn.append({
+                            'word': key,
+                            'synonym': key2,
+                            'pos_word': pos,
+                            'pos_synonym': pos2
+                        })
+            file_result.append(res_syn)
+        result.append(file_result)
+    return result
+
+
+def get_synonyms(value) -> dict:
+    """
+    Helper function to get the synonyms of a comment as a dict, from a .parquet file they already are one and from a
+    .csv file they are its string representation.
+    Args:
+        value: The synonyms column of a row.
+
+    Returns:
+        Dict with words as keys and synonyms list as value.
+    """
+    return ast.literal_eval(value) if isinstance(value, str) else value
+
+
+def get_abbreviations(value):
+    """
+    Helper function to get the abbreviations of a comment in their .csv representation, a set or an empty dict. From a
+    .parquet file or a dataframe of the exporter they are a list.
+    Args:
+        value: The abbreviations column of a row.
+
+    Returns:
+        String representation of the abbreviations, the value itself if it is no list.
+    """
+    if not isinstance(value, (list, tuple, np.ndarray)):
+        return value
+    return str(set(value)) if len(value) > 0 else "{}"
+
+
+def is_english(df: pd.DataFrame) -> pd.Series:
+    """
+        Helper function to determine which comments are in english (probability > 0.75).
         Args:
-            row: The row of the df to evaluate.
+            df: The df to evaluate.
 
         Returns:
-            1 if english, 0 otherwise.
+            Series, 1 if english, 0 otherwise.
     """
-    return 0 if row["language"] != "en" or row["language_proba"] < 0.75 else 1
+    return ((df["language"] == "en") & ~(get_numbers(df, "language_proba") < 0.75)).astype(int)
 
 
-def is_too_short(row) -> int:
+def is_too_short(df: pd.DataFrame) -> pd.Series:
     """
-        Helper function to determine if a comment is too short (N_words < 3).
+        Helper function to determine which comments are too short (N_words < 3).
         Args:
-            row: The row of the df to evaluate.
+            df: The df to evaluate.
 
         Returns:
-            1 if too short, 0 otherwise.
+            Series, 1 if too short, 0 otherwise.
     """
-    return 1 if row["N_words"] < 3 else 0
+    return (get_numbers(df, "N_words") < 3).astype(int)
 
 
-def is_too_long(row) -> int:
+def is_too_long(df: pd.DataFrame) -> pd.Series:
     """
-        Helper function to determine if an in-line comment is too long (N_words > 30).
+        Helper function to determine which in-line comments are too long (N_words > 30).
         Args:
-            row: The row of the df to evaluate.
+            df: The df to evaluate.
 
         Returns:
-            1 if too long, 0 otherwise.
+            Series, 1 if too long, 0 otherwise.
     """
-    return 1 if row["type"] == "in-line" and row["N_words"] > 30 else 0
+    return ((df["type"] == "in-line") & (get_numbers(df, "N_words") > 30)).astype(int)
 
 
-def is_trivial(row) -> int:
+def is_trivial(df: pd.DataFrame) -> pd.Series:
     """
-        Helper function to determine if a comment is trivial. A comment is trivial when its coherence coefficient is
-        > 0.5 as it contains few extra information besides repeating the handle.
+        Helper function to determine which comments are trivial. A comment is trivial when its coherence coefficient
+        is > 0.5 as it contains few extra information besides repeating the handle.
         Args:
-            row: The row of the df to evaluate.
+            df: The df to evaluate.
 
         Returns:
-            1 if trivial, 0 otherwise.
+            Series, 1 if trivial, 0 otherwise.
     """
-    return 1 if row["coherence_coefficient"] is not None and row["coherence_coefficient"] > 0.5 else 0
+    return (get_numbers(df, "coherence_coefficient") > 0.5).astype(int)
 
 
-def is_unrelated(row) -> int:
+def is_unrelated(df: pd.DataFrame) -> pd.Series:
     """
-        Helper function to determine if a comment is unrelated. A comment is unrelated when its coeherence coefficient
-        is exactly 0, as the comment has no words in common with the handle.
+        Helper function to determine which comments are unrelated. A comment is unrelated when its coeherence
+        coefficient is exactly 0, as the comment has no words in common with the handle.
         Args:
-            row: The row of the df to evaluate.
+            df: The df to evaluate.
 
         Returns:
-            1 if unrelated, 0 otherwise.
+            Series, 1 if unrelated, 0 otherwise.
+    """
+    return (get_numbers(df, "coherence_coefficient") == 0.0).astype(int)
+
+
+def is_ignore(df: pd.DataFrame) -> pd.Series:
     """
-    return 1 if row["coherence_coefficient"] is not None and row["coherence_coefficient"] == 0.0 else 0
+    Helper function to determine which comments should be ignored.
+    Headers, commented code, non-english, too short and missing comments get ignored.
+    Args:
+        df: The df to evaluate, with the is_english and is_too_short columns.
+
+    Returns:
+        Boolean series, True if ignored, False otherwise.
+    """
+    return (df["type"] == "header") | (df["is_code"] == 1) | (df["is_english"] == 0) | (df["is_too_short"] == 1) | (
+            df["count_missing"] == 1)
+
+
+def get_numbers(df: pd.DataFrame, column: str) -> pd.Series:
+    """
+    Helper function to get a column as numbers, missing values (None) become NaN and fail every comparison.
+    Args:
+        df: The df to get the column from.
+        column: Name of the column.
+
+    Returns:
+        Numeric series.
+    """
+    return pd.to_numeric(df[column], errors="coerce")
+
+
+FLAG_RULES: dict = {"is_english": is_english, "is_too_short": is_too_short, "is_too_long": is_too_long,
+                    "is_trivial": is_trivial, "is_unrelated": is_unrelated, "ignore": is_ignore}
+"""Defines the flag columns and the rules computing them from whole columns, in order, so a rule may use the flags
+before it"""
 
 
 def valid_file(path) -> bool:
@@ -363,63 +614,64 @@ def valid_file(path) -> bool:
     return path.lower().endswith(VALID_EXTENSIONS)
 
 
-def get_value(d, key):
+def get_relative_path(path: str, project: str) -> str:
     """
-    Helper Function to get the value of a grouped dataframe with a key to a column.
+    Helper function to get the path of a file or directory relative to the project, the key it is aggregated under.
     Args:
-        d: DataFrame to get value from
-        key: Key of value to get
+        path: Path relative to the project, e.g. './dir/file.java' as named by srcML, or absolute.
+        project: Path to the project directory.
 
     Returns:
-        The value
+        The normalized relative path with forward slashes, '' for the project directory itself.
     """
-    return d[key].values[0] if len(d[key].values) > 0 else None
+    if os.path.isabs(path):
+        path = os.path.relpath(path, project)
+    path = posixpath.normpath(path.replace("\\", "/"))
+    return "" if path == "." else path
 
 
-def main(project: str, output: str, comments: str, missing_comments: str, syn: int):
+def main(project: str, output: str, comments: str, missing_comments: str, syn: int, workers: int = 1):
     """
     Evaluate the results of the rater class.
 
     Args:
-        project: Path to directory of project to analyze.
+        project: Path to directory of the analyzed project, it does not need to exist anymore.
         output: Path to output file.
-        comments: Path to .csv with all found comments of the rater.
-        missing_comments: Path to .csv with all missing comments found by the rater.
-        syn: Flag for synonym analysis (0 or 1). Not recommended for big projects.
+        comments: Path to .csv or .parquet with all found comments of the rater.
+        missing_comments: Path to .csv or .parquet with all missing comments found by the rater.
+        syn: Flag for synonym analysis (0 or 1).
+        workers: Number of worker processes matching the synonyms of the files and evaluating the subtrees.
 
     Returns:
         Creates a .json file at the output location.
     """
-    # check if project is a valid directory
-    if not os.path.isdir(project):
-        logging.error("The project directory does not exist.")
-        exit()
     # instantiate evaluator
     c = CommentEvaluator(project, comments, missing_comments)
     # evaluate missing and found comments
-    c.evaluate(output, syn)
+    c.evaluate(output, syn, workers)
 
 
 if __name__ == '__main__':
     # mandatory arguments
     parser = argparse.ArgumentParser(description='Evaluate scraped comments and save the data as a .json')
     parser.add_argument('project', metavar='Project', type=str,
-                        help='Path to the project directory to evaluate.')
+                        help='Path to the project directory the comments were scraped from, it does not need to exist anymore.')
 
     parser.add_argument('output', metavar='Output', type=str,
                         help='Path for the output .json file')
 
     parser.add_argument('comments', metavar='Comments', type=str,
-                        help='Path to the scraped comments .csv')
+                        help='Path to the scraped comments .csv or .parquet')
 
     parser.add_argument('missing_comments', metavar='Missing_Comments', type=str,
-                        help='Path to the scraped missing comments .csv')
+                        help='Path to the scraped missing comments .csv or .parquet')
 
     # optional arguments
-    parser.add_argument("-syn", "--synonyms", type=int, help="Enable synonym analysis of comments in files. Not "
-                                                             "recommended for big projects due to complexity. [0 ("
+    parser.add_argument("-syn", "--synonyms", type=int, help="Enable synonym analysis of comments in files. [0 ("
                                                              "default), 1].",
                         choices=[0, 1], default=0)
+    parser.add_argument("-workers", "--workers", type=int, default=1,
+                        help="Number of processes matching the synonyms and evaluating the subtrees. Example --workers 8, default=1")
 
     levels = {
         'critical': logging.CRITICAL,
@@ -439,6 +691,6 @@ if __name__ == '__main__':
     logging.basicConfig(format='%(asctime)s -%(levelname)s- [%(filename)s:%(lineno)d] \n \t %(message)s',
                         level=level, stream=sys.stdout)
     # run main function
-    main(args.project.replace("\\", "/"), args.output, args.comments, args.missing_comments, args.synonyms)
+    main(args.project.replace("\\", "/"), args.output, args.comments, args.missing_comments, args.synonyms, args.workers)
 
     exit()
@@ -19,54 +19,248 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 import csv
+import math
+
+COLUMN_TYPES = {"id": "int", "path": "string", "position": "string", "type": "string", "handle": "string",
+                "text": "string", "label": "string", "label_proba": "float", "coherence_coefficient": "float",
+                "N_question": "int", "N_exclamation": "int", "processed_text": "string", "N_words": "int",
+                "N_complex_words": "int", "N_syllables": "int", "N_sentences": "int", "words": "list",
+                "complex_words": "list", "syllables": "list", "sentences": "list", "fkgls": "float", "frel": "float",
+                "fi": "float", "abbreviations": "list", "N_abbreviations": "int", "time_millis": "float",
+                "language": "string", "language_proba": "float", "synonyms": "map", "is_code": "int",
+                "code_language": "string", "count": "int", "count_missing": "int"}
+"""Type of every column of the Parquet files, lists hold strings and maps lists of strings, other columns are strings"""
+
+LEAN_COLUMNS = ["words", "complex_words", "syllables", "sentences"]
+"""Bulky token list columns the lean profile leaves out"""
 
 
 class CommentExporter:
     """
-    Class for exporting the found comment objects to a .csv file
+    Class for exporting the found comment objects to a .csv or .parquet file, chosen by the extension of the path.
+    The .parquet files are typed, with the lists and synonyms in nested columns.
+
+    Args:
+        lean: Leave out the token lists (words, complex words, syllables and sentences) of the comments.
 
     Attributes:
-        comments_header: List of the column names of the resulting .csv for the found comments.
-        missing_comments_header: List of the column names of the resulting .csv for the missing comments.
+        comments_header: List of the column names of the resulting file for the found comments.
+        missing_comments_header: List of the column names of the resulting file for the missing comments.
     """
-    def __init__(self):
+    def __init__(self, lean: bool = False):
         self.comments_header = ["id", "path", "position", "type", "handle", "text", "label", "label_proba",
                                 "coherence_coefficient", "N_question", "N_exclamation",
                                 "processed_text", "N_words", "N_complex_words", "N_syllables", "N_sentences",
                                 "words", "complex_words", "syllables", "sentences",
                                 "fkgls", "frel", "fi", "abbreviations", "N_abbreviations",
                                 "time_millis", "language", "language_proba", "synonyms", "is_code", "code_language"]
+        # indices of the columns written, all of them unless lean
+        self.columns = [i for i, c in enumerate(self.comments_header) if not (lean and c in LEAN_COLUMNS)]
 
         self.missing_comments_header = ["path", "position", "handle", "type"]
 
     def export_comments(self, comments: list, path: str):
         """
-        Export the found comments to a .csv file
+        Export the found comments to a .csv or .parquet file
         Args:
             comments: List of found comments
             path: Path to output file
 
         Returns:
-            Creates a .csv at the output location with the found comments' data
+            Creates a .csv or .parquet at the output location with the found comments' data
         """
+        header = [self.comments_header[i] for i in self.columns]
+        rows = ([row[i] for i in self.columns] for row in (c.get_row() for c in comments))
+        if is_parquet(path):
+            write_parquet(list(rows), header, path)
+            return
         with open(path, "w", newline='', encoding="UTF-8") as csv_file:
             writer = csv.writer(csv_file, delimiter=',')
-            writer.writerow(self.comments_header)
-            for comment in comments:
-                writer.writerow(comment.get_row())
+            writer.writerow(header)
+            writer.writerows(rows)
 
     def export_missing_comments(self, comments: list, path: str):
         """
-        Export the missing comments to a .csv file
+        Export the missing comments to a .csv or .parquet file
         Args:
             comments: List of missing comments
             path: Path to output file
 
         Returns:
-            Creates a .csv at the output location with the missing comments' data
+            Creates a .csv or .parquet at the output location with the missing comments' data
         """
+        rows = [[c["file"], c["pos"], c["name"], c["type"]] for c in comments]
+        if is_parquet(path):
+            write_parquet(rows, self.missing_comments_header, path)
+            return
         with open(path, "w", newline='', encoding="UTF-8") as csv_file:
             writer = csv.writer(csv_file, delimiter=',')
             writer.writerow(self.missing_comments_header)
-            for c in comments:
-                writer.writerow([c["file"], c["pos"], c["name"], c["type"]])
\ No newline at end of file
+            writer.writerows(rows)
+
+    def get_comments_frame(self, comments: list):
+        """
+        Create a pandas dataframe of the found comments, with the same columns and values as their .parquet file read
+        with read_data.
+        Args:
+            comments: List of found comments
+
+        Returns:
+            pandas dataframe.
+        """
+        header = [self.comments_header[i] for i in self.columns]
+        return get_frame([[row[i] for i in self.columns] for row in (c.get_row() for c in comments)], header)
+
+    def get_missing_comments_frame(self, comments: list):
+        """
+        Create a pandas dataframe of the missing comments, with the same columns and values as their .parquet file
+        read with read_data.
+        Args:
+            comments: List of missing comments
+
+        Returns:
+            pandas dataframe.
+        """
+        return get_frame([[c["file"], c["pos"], c["name"], c["type"]] for c in comments],
+                         self.missing_comments_header)
+
+
+def is_parquet(path: str) -> bool:
+    """
+    Helper function to determine if a file is written as Parquet instead of CSV.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        True if the path ends with .parquet, False otherwise.
+    """
+    return path.lower().endswith(".parquet")
+
+
+def get_schema(columns: list):
+    """
+    Helper function to create the Arrow schema of a Parquet file.
+
+    Args:
+        columns: List of column names, see COLUMN_TYPES.
+
+    Returns:
+        pyarrow schema with the columns in the given order.
+    """
+    import pyarrow as pa
+    types = {"int": pa.int64(), "float": pa.float64(), "string": pa.string(), "list": pa.list_(pa.string()),
+             "map": pa.map_(pa.string(), pa.list_(pa.string()))}
+    return pa.schema([(c, types[get_type(c)]) for c in columns])
+
+
+def get_type(column: str) -> str:
+    """
+    Helper function to get the type of a column, e.g. a column added to a dataframe read with read_data is a string.
+
+    Args:
+        column: Name of the column.
+
+    Returns:
+        Type of the column, see COLUMN_TYPES.
+    """
+    return COLUMN_TYPES.get(column, "string")
+
+
+def to_arrow(value, typ: str):
+    """
+    Helper function to convert a value of a row into the Python object Arrow expects for the type of its column.
+
+    Args:
+        value: Value of the row.
+        typ: Type of the column, see COLUMN_TYPES.
+
+    Returns:
+        The converted value, None for missing values.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if typ == "int":
+        return int(value)
+    if typ == "float":
+        return float(value)
+    if typ == "list":
+        # sets, e.g. the abbreviations, are sorted for a stable order
+        return sorted(value) if isinstance(value, (set, frozenset, dict)) else list(value)
+    if typ == "map":
+        return list(value.items())
+    return value if isinstance(value, str) else str(value)
+
+
+def write_parquet(rows: list, columns: list, path: str):
+    """
+    Write rows to a typed Parquet file.
+
+    Args:
+        rows: List of rows, each a list of values in the order of the columns.
+        columns: List of column names, see COLUMN_TYPES.
+        path: Path to the output file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = get_schema(columns)
+    types = [get_type(c) for c in columns]
+    arrays = [pa.array([to_arrow(row[i], typ) for row in rows], schema.field(i).type) for i, typ in enumerate(types)]
+    pq.write_table(pa.Table.from_arrays(arrays, schema=schema), path)
+
+
+def get_frame(rows: list, columns: list):
+    """
+    Create a pandas dataframe of rows with the values converted like in a .parquet file, keeping the synonyms dicts.
+
+    Args:
+        rows: List of rows, each a list of values in the order of the columns.
+        columns: List of column names, see COLUMN_TYPES.
+
+    Returns:
+        pandas dataframe.
+    """
+    import pandas as pd
+    types = [get_type(c) for c in columns]
+    return pd.DataFrame([[value if typ == "map" else to_arrow(value, typ) for value, typ in zip(row, types)]
+                         for row in rows], columns=columns)
+
+
+def read_data(path: str):
+    """
+    Read a .csv or .parquet file written by the exporter into a pandas dataframe. The list columns of a .parquet file
+    hold lists and the synonyms dicts, the columns of a .csv file hold their string representation.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        pandas dataframe.
+    """
+    import pandas as pd
+    if not is_parquet(path):
+        return pd.read_csv(path)
+    import pyarrow.parquet as pq
+    df = pq.read_table(path).to_pandas()
+    for column in df.columns:
+        typ = COLUMN_TYPES.get(column)
+        if typ == "list":
+            df[column] = [None if v is None else list(v) for v in df[column]]
+        elif typ == "map":
+            df[column] = [None if v is None else {k: list(s) for k, s in v} for v in df[column]]
+    return df
+
+
+def write_data(df, path: str):
+    """
+    Write a pandas dataframe read by read_data to a .csv or .parquet file.
+
+    Args:
+        df: pandas dataframe.
+        path: Path to the output file.
+    """
+    if not is_parquet(path):
+        df.to_csv(path, index=False)
+        return
+    columns = list(df.columns)
+    write_parquet(list(zip(*[df[c].tolist() for c in columns])), columns, path)
@@ -19,28 +19,30 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 """
-Filter scraped comments from the rater class by code language and comment label. Creates a .csv file
-for filtered comments.
+Filter scraped comments from the rater class by code language and comment label. Creates a .csv or .parquet file,
+like the input, for filtered comments.
 
 For a smooth performance, make sure that the root of the repository is the working directory when
 running the script and use absolute paths as the arguments.
 
 Example:
     $ python comment_filter.py comments.csv -label summary -lang c++
+    $ python comment_filter.py comments.parquet -label summary
 """
 
 import argparse
 import logging
 import os
 import sys
-import pandas as pd
+
+from quality_assessment.src.comment_exporter import read_data, write_data
 
 class CommentFilter:
     """
-    Contains functions and attributes for filtering a .csv generated by the rater class.
+    Contains functions and attributes for filtering a .csv or .parquet generated by the rater class.
 
     Args:
-        comment_data: Path to .csv containing all found comments.
+        comment_data: Path to .csv or .parquet containing all found comments, or their pandas dataframe.
 
     Attributes:
         data_frame: Main pandas dataframe that is used for calculations inside the class.
@@ -48,7 +50,7 @@ class CommentFilter:
 
     def __init__(self, comment_data: str):
         # save found comments as dataframe
-        self.data_frame = pd.read_csv(comment_data)
+        self.data_frame = read_data(comment_data) if isinstance(comment_data, str) else comment_data
 
     def filter(self, language: str, label: str):
         """
@@ -68,30 +70,30 @@ def main(comments: str, language: str, label: str):
     Filter the results of the rater class.
 
     Args:
-        comments: Path to .csv with all found comments of the rater.
+        comments: Path to .csv or .parquet with all found comments of the rater.
         language: Code language of files.
         label: Comment label (summary, usage, rationale, expand, warning).
 
     Returns:
-        Creates a .csv file with the data of resulting comments.
+        Creates a file of the same format with the data of resulting comments.
     """
     # Get filename for filtered comments
     res_path, res_filename = os.path.split(comments)
-    res_filename = os.path.splitext(res_filename)[0]
-    filtered_filename = f"{res_filename}_filtered.csv"
+    res_filename, res_extension = os.path.splitext(res_filename)
+    filtered_filename = f"{res_filename}_filtered{res_extension}"
     filtered_filepath = os.path.join(res_path, filtered_filename)
 
-    # Filter and produce a csv file
+    # Filter and produce a csv or parquet file
     comment_filter = CommentFilter(comments)
     comment_filter.filter(language, label)
-    comment_filter.data_frame.to_csv(filtered_filepath, index=False)
+    write_data(comment_filter.data_frame, filtered_filepath)
 
 if __name__ == '__main__':
     # mandatory arguments
     parser = argparse.ArgumentParser(
-        description='Filter scraped comments and export data as a .csv')
+        description='Filter scraped comments and export data as a .csv or .parquet')
     parser.add_argument('comments', metavar='Comments', type=str,
-                        help='Path to the scraped comments .csv')
+                        help='Path to the scraped comments .csv or .parquet')
 
     # optional arguments
     labels = {
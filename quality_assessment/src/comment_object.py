@@ -48,6 +48,10 @@ class Comment:
         self.complex_words = None
         self.sentences = None
         self.syllables = None
+        self.n_words = None
+        self.n_complex_words = None
+        self.n_sentences = None
+        self.n_syllables = None
 
         # usefulness
         self.label = None
@@ -79,7 +83,7 @@ class Comment:
         abbr = self.abbreviations if len(self.abbreviations) > 0 else {}
         return [self.id, self.path, self.line, self.type, self.handle, self.text, self.label, self.label_probability,
                 self.coherence_coefficient, self.question_marks, self.exclamation_marks,
-                self.processed_text, len(self.words), len(self.complex_words), len(self.syllables), len(self.sentences),
+                self.processed_text, self.n_words, self.n_complex_words, self.n_syllables, self.n_sentences,
                 self.words, self.complex_words, self.syllables, self.sentences,
                 self.flesch_kincaid_grade_level, self.flesch_reading_ease_level, self.fog_index, abbr, len(abbr),
                 self.time_millis, self.language[0], self.language[1], syn, self.is_code, self.code_language]
@@ -19,64 +19,120 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 """
-Scrape a project directory for comments and rate their contents/data. Creates a .csv file for found comments and one for missing comments.
+Scrape a project directory for comments and rate their contents/data. Creates a .csv or .parquet file for found comments and one for missing comments.
 For a smooth performance, make sure that the root of the repository is the working directory when running the script and use absolute paths as the arguments.
 
 Example:
     $ python comment_rater.py C:\\my_project comments.csv C:\\my_models -log warning
+    $ python comment_rater.py C:\\my_project comments.parquet C:\\my_models -lean 1
 """
 
 import argparse
 import csv
-import datetime
+import functools
 import logging
+import multiprocessing
 import os
 import re
 import sys
-import fasttext
-from Levenshtein import distance as levenshtein_distance
-from stemming.porter2 import stem
+import time
 
 sys.path.append('classification/src/classifiers')
 sys.path.append('classification/src/')
 
-from quality_assessment.src.comment_scraper import CommentScraper
+from quality_assessment.src.comment_scraper import CommentScraper, BACKENDS
+from quality_assessment.src.path_filter import PathFilter, SOURCE_EXTENSIONS, IGNORE_FILE
+from quality_assessment.src.comment_cache import CommentCache, get_version
+from quality_assessment.src.comment_checkpoint import CommentCheckpoint, get_signature
 from quality_assessment.src.comment_exporter import CommentExporter
 from quality_assessment.src.tokenizer import Tokenizer
-from classification.src.predictor import Predictor
-from nltk.corpus import wordnet as wn
-from nltk.corpus import stopwords
+from quality_assessment.src.synonym_lexicon import SynonymLexicon, LEXICON_PATH
+from quality_assessment.src.stage_timer import StageTimer
+
+BATCH_SIZE = 256
+"""Default number of comments rated together"""
+
+CHUNK_SIZE = 8192
+"""Default number of comments scraped before they are rated and cached or checkpointed"""
+
+RATER = None
+"""Rater of the forked worker processes, inherited from the parent process"""
+
+TEXT_FIELDS = ["abbreviations", "processed_text", "label", "label_probability", "question_marks", "exclamation_marks",
+               "words", "complex_words", "sentences", "syllables", "n_words", "n_complex_words", "n_sentences",
+               "n_syllables", "fog_index", "flesch_kincaid_grade_level", "flesch_reading_ease_level", "language",
+               "unique_words_swr", "synonyms", "is_code", "time_millis"]
+"""Fields of a rated comment that only depend on its text, shared by comments with the same text"""
+
+CORPORA = {"stopwords": ["corpora/stopwords"], "punkt": ["tokenizers/punkt", "tokenizers/punkt_tab"]}
+"""NLTK data the rater needs and the resource names NLTK may store it under"""
 
 
 class Rater:
     """
-    Contains functions and attributes for rating all comments in a directory and generates 2 output .csv files
+    Contains functions and attributes for rating all comments in a directory and generates 2 output .csv files.
+    The language model, stopwords and classification models are loaded on first use.
 
     Args:
         models: Path to comment classification models directory.
+        counts_only: Only count the complex words, sentences and syllables of comments instead of keeping their lists,
+            sentences are counted with a regex instead of NLTK.
+        timer: StageTimer instance collecting the durations of the rating stages, None for a new one.
+        cascade: Skip the classification, readability metrics and synonyms of comments the evaluator ignores.
 
     Attributes:
         abbreviations: Detected abbreviations.
         tokenizer: Tokenizer instance for NLP.
+        models: Path to comment classification models directory.
         language_model: Fasttext Model for classifying natural language (e.g. english).
         sw: Set of Stopwords for SWR.
         predictor: Predictor instance for comment label classification.
+        synonym_lexicon: SynonymLexicon instance for the synonym analysis.
+        timer: StageTimer instance collecting the durations of the rating stages.
+        cascade: Whether comments the evaluator ignores skip the expensive stages.
     """
 
-    def __init__(self, models: str):
+    def __init__(self, models: str, counts_only: bool = False, timer: StageTimer = None, cascade: bool = False):
         self.abbreviations = {}
         # read abbreviations list and save in a more accessible format
         reader = csv.reader(
             open(r'quality_assessment/data/abbreviations.csv', 'r'))
         for row in reader:
             self.abbreviations[row[0]] = row[1]
-        self.tokenizer = None
+        # one tokenizer for all comments
+        self.tokenizer = Tokenizer(counts_only)
+        self.models = models
+        # memoized synonym lookup, reading the precomputed lexicon if it was built
+        self.synonym_lexicon = SynonymLexicon(LEXICON_PATH)
+        self.timer = timer or StageTimer()
+        self.cascade = cascade
+
+    @functools.cached_property
+    def language_model(self):
         # load the natural language classification model
-        self.language_model = fasttext.load_model(r'quality_assessment/data/lid.176.ftz')
+        import fasttext
+        return fasttext.load_model(r'quality_assessment/data/lid.176.ftz')
+
+    @functools.cached_property
+    def sw(self) -> set:
         # save stopwords as a set
-        self.sw = set(stopwords.words('english'))
+        from nltk.corpus import stopwords
+        return set(stopwords.words('english'))
+
+    @functools.cached_property
+    def predictor(self):
         # instantiate predictor with the given models
-        self.predictor = Predictor(models)
+        from classification.src.predictor import Predictor
+        return Predictor(self.models)
+
+    def load(self):
+        """
+        Loads the language model, stopwords and classification models that are otherwise loaded on first use,
+        e.g. before forking worker processes, so they share them instead of loading them again.
+        """
+        self.language_model
+        self.sw
+        self.predictor.load_models()
 
     def rate(self, comments: list):
         """
@@ -85,38 +141,86 @@ class Rater:
         Args:
             comments: list of comment objects to rate.
         """
-        # iterate over all comments
-        for comment in comments:
+        self.rate_batch(comments, 1)
+
+    def rate_batch(self, comments: list, batch_size: int = BATCH_SIZE):
+        """
+        Rate comments block by block and write values into comment objects. The language identification and the label
+        classification run once per block on the list of its texts, the results are the same as rating one by one.
+        When cascading, the comments the evaluator ignores are not classified and get no readability metrics and
+        synonyms.
+
+        Args:
+            comments: list of comment objects to rate.
+            batch_size: number of comments per block.
+        """
+        timer = self.timer
+        for i in range(0, len(comments), batch_size):
+            batch = comments[i:i + batch_size]
             # save start_time for calculating processing time later
-            start_time = datetime.datetime.now()
-            # set abbreviations as the intersection of the words and the abbreviation set
-            comment.abbreviations = set(re.split(r"\s+", comment.text)).intersection(self.abbreviations.keys())
-            # preprocess comment
-            preprocess(comment)
-            # predict label of comment
-            t = self.predictor.predict(comment.processed_text, 0)
-            # write label and probability
-            comment.label = t[0]
-            comment.label_probability = t[1]
-            # count question and exclamation marks in text
-            comment.question_marks = comment.text.count("?")
-            comment.exclamation_marks = comment.text.count("!")
-            # instantiate a tokenizer and get the stats
-            self.tokenizer = Tokenizer()
-            self.tokenizer.get_stats(comment)
-            # get readability metrics
-            comment.coherence_coefficient = get_coherence_coefficient(comment.words, comment.handle)
-            comment.fog_index = self.get_fog_index()
-            comment.flesch_kincaid_grade_level = self.get_flesch_kincaid_grade_level()
-            comment.flesch_reading_ease_level = self.get_flesch_reading_ease_level()
-            comment.language = self.get_language(comment.processed_text)
-            comment.unique_words_swr = self.get_unique_words_swr()
-            comment.synonyms = get_synonyms(comment.unique_words_swr)
-            comment.is_code = is_commented_code(comment)
-            # calculate and write processing time in milliseconds
-            comment.time_millis = (datetime.datetime.now() - start_time).total_seconds() * 1000
-
-    def get_flesch_kincaid_grade_level(self) -> float:
+            start_time = time.perf_counter()
+            for comment in batch:
+                t = time.perf_counter()
+                # set abbreviations as the intersection of the words and the abbreviation set
+                comment.abbreviations = set(re.split(r"\s+", comment.text)).intersection(self.abbreviations.keys())
+                # preprocess comment
+                preprocess(comment)
+                timer.add("preprocess", time.perf_counter() - t)
+            # predict the natural languages of the whole batch
+            t = time.perf_counter()
+            languages = self.get_languages([comment.processed_text for comment in batch])
+            timer.add("language", time.perf_counter() - t, len(batch))
+            for comment, language in zip(batch, languages):
+                comment.language = language
+                # count question and exclamation marks in text
+                comment.question_marks = comment.text.count("?")
+                comment.exclamation_marks = comment.text.count("!")
+                # get the stats with the tokenizer
+                t = time.perf_counter()
+                self.tokenizer.get_stats(comment)
+                timer.add("tokenize", time.perf_counter() - t)
+                t = time.perf_counter()
+                comment.is_code = is_commented_code(comment)
+                timer.add("is_code", time.perf_counter() - t)
+                t = time.perf_counter()
+                comment.coherence_coefficient = get_coherence_coefficient(comment.words, comment.handle)
+                timer.add("metrics", time.perf_counter() - t)
+            rated = batch
+            if self.cascade:
+                # the cheap checks are done, skip the expensive stages of the comments the evaluator ignores
+                rated = []
+                for comment in batch:
+                    if is_ignored(comment):
+                        comment.unique_words_swr = []
+                        comment.synonyms = {}
+                    else:
+                        rated.append(comment)
+            # predict the labels of the whole batch
+            labels = []
+            if rated:
+                t = time.perf_counter()
+                labels = self.predictor.predict_batch([comment.processed_text for comment in rated], 0)
+                timer.add("predict", time.perf_counter() - t, len(rated))
+            for comment, label in zip(rated, labels):
+                # write label and probability
+                comment.label = label[0]
+                comment.label_probability = label[1]
+                # get readability metrics
+                t = time.perf_counter()
+                comment.fog_index = self.get_fog_index(comment)
+                comment.flesch_kincaid_grade_level = self.get_flesch_kincaid_grade_level(comment)
+                comment.flesch_reading_ease_level = self.get_flesch_reading_ease_level(comment)
+                comment.unique_words_swr = self.get_unique_words_swr(comment)
+                timer.add("metrics", time.perf_counter() - t)
+                t = time.perf_counter()
+                comment.synonyms = self.synonym_lexicon.get_synonyms(comment.unique_words_swr)
+                timer.add("synonyms", time.perf_counter() - t)
+            # calculate and write processing time in milliseconds, shared evenly by the comments of a batch
+            millis = (time.perf_counter() - start_time) * 1000 / len(batch)
+            for comment in batch:
+                comment.time_millis = millis
+
+    def get_flesch_kincaid_grade_level(self, comment) -> float:
         """
         Calculates the Flesch-Kincaid grade level, which returns a U.S. grade school level of difficulty to read.
         A 8.0 means that the document can be understood by an eighth grader.
@@ -124,43 +228,50 @@ class Rater:
 
         (11.8 * syllables_per_word) + (0.39 * words_per_sentence) - 15.59
 
+        Args:
+            comment: Comment object with the counts of the tokenizer.
+
         Returns: Flesch-Kincaid grade level score.
         """
-        syl = self.tokenizer.syllables
-        sen = self.tokenizer.sentences
-        words = self.tokenizer.words
-        return 0 if len(sen) == 0 or len(words) == 0 else (11.8 * (len(syl) / len(words))) + (
-                0.39 * (len(words) / len(sen))) - 15.59
+        syl = comment.n_syllables
+        sen = comment.n_sentences
+        words = comment.n_words
+        return 0 if sen == 0 or words == 0 else (11.8 * (syl / words)) + (0.39 * (words / sen)) - 15.59
 
-    def get_flesch_reading_ease_level(self) -> float:
+    def get_flesch_reading_ease_level(self, comment) -> float:
         """
         Calculates the Flesch reading ease test rates text on a 100 point scale.
         The higher the score, the easier it is to understand the text.
         A score of 60 to 70 is considered to be optimal.
 
         206.835 - (1.015 * words_per_sentence) - (84.6 * syllables_per_word)
+
+        Args:
+            comment: Comment object with the counts of the tokenizer.
+
         Returns: Flesch reading ease level.
         """
-        syl = self.tokenizer.syllables
-        sen = self.tokenizer.sentences
-        words = self.tokenizer.words
-        return 0 if len(sen) == 0 or len(words) == 0 else 206.835 - (1.015 * (len(words) / len(sen))) - (
-                84.6 * len(syl) / len(words))
+        syl = comment.n_syllables
+        sen = comment.n_sentences
+        words = comment.n_words
+        return 0 if sen == 0 or words == 0 else 206.835 - (1.015 * (words / sen)) - (84.6 * syl / words)
 
-    def get_fog_index(self) -> float:
+    def get_fog_index(self, comment) -> float:
         """
         Calculates the Fog Index, which indicates the number of years of formal education a reader .
         would need to understand the text on the first reading.
 
         ( words_per_sentence + percent_complex_words ) * 0.4
 
+        Args:
+            comment: Comment object with the counts of the tokenizer.
+
         Returns: Fog Index.
         """
-        sen = self.tokenizer.sentences
-        words = self.tokenizer.words
-        com = self.tokenizer.complex_words
-        return 0 if len(sen) == 0 or len(words) == 0 else ((len(words) / len(sen)) + (
-                (len(com) / len(words)) * 100)) * 0.41
+        sen = comment.n_sentences
+        words = comment.n_words
+        com = comment.n_complex_words
+        return 0 if sen == 0 or words == 0 else ((words / sen) + ((com / words) * 100)) * 0.41
 
     def get_language(self, text: str) -> tuple:
         """
@@ -176,36 +287,32 @@ class Rater:
         prediction = self.language_model.predict(text)
         return prediction[0][0].split('__label__')[1], prediction[1][0]
 
-    def get_unique_words_swr(self):
+    def get_languages(self, texts: list) -> list:
         """
-        Helper function to create a list of unique words without stopwords for the synonym analysis.
+        Helper function to predict the natural language of a list of texts at once.
 
-        Returns: List of unique words in comment minus stopwords.
-        """
-        unique = list(set(self.tokenizer.words))
-        return [w for w in unique if w not in self.sw]
+        Args:
+            texts: Texts of comments to evaluate.
 
+        Returns:
+            list of ('language', 'probability') tuples like get_language.
+        """
+        import numpy as np
+        labels, probabilities = self.language_model.predict(texts)
+        # the probabilities of a list are single precision, convert them like a single prediction
+        return [(l[0].split('__label__')[1], np.float64(p[0])) for l, p in zip(labels, probabilities)]
 
-def get_synonyms(words: list) -> dict:
-    """
-    Creates a list of synonyms for each word in a list of words using wordnet.
+    def get_unique_words_swr(self, comment):
+        """
+        Helper function to create a list of unique words without stopwords for the synonym analysis.
 
-    Args:
-        words: List of words to evaluate.
+        Args:
+            comment: Comment object with the words of the tokenizer.
 
-    Returns:
-        Dict with words as keys and synonyms list as value.
-    """
-    res = {}
-    for word in words:
-        synets = wn.synsets(word)
-        tmp = []
-        for synset in synets:
-            for w in synset.lemma_names():
-                if "_" not in w and word != w and w not in tmp and stem(w) != stem(word):
-                    tmp.append(w)
-        res[word] = tmp
-    return res
+        Returns: List of unique words in comment minus stopwords.
+        """
+        unique = list(set(comment.words))
+        return [w for w in unique if w not in self.sw]
 
 
 def remove_abbreviations(comment) -> str:
@@ -312,19 +419,94 @@ def get_coherence_coefficient(words: list, look_up: str):
     # do not calculate if words or look_up are empty/non-existent/zero
     if look_up == None or look_up == "" or words == None or len(words) == 0:
         return None
-    similar_words = 0
-    # most handles are written in camel case, so we need to split it up
-    split_look_up = split_camel_case(look_up).lower().split()
+    matcher = get_handle_matcher(look_up)
     # all words to lower case for comparison
     split_words = map(lambda x: x.lower(), words)
-    # calculate coherence coefficient
+    # calculate coherence coefficient, counting every handle word with a levenshtein distance < 2 to a word
+    similar_words = 0
     for word in split_words:
-        for check in split_look_up:
-            if levenshtein_distance(word, check) < 2:
-                similar_words += 1
+        similar_words += matcher.count(word)
     return similar_words / len(words)
 
 
+@functools.lru_cache(maxsize=4096)
+def get_handle_matcher(look_up: str):
+    """
+    Helper function to build the matcher of a handle once and reuse it for all comments on the same handle.
+
+    Args:
+        look_up: handle to match words against
+
+    Returns:
+        HandleMatcher of the handle.
+    """
+    # most handles are written in camel case, so we need to split it up
+    return HandleMatcher(split_camel_case(look_up).lower().split())
+
+
+class HandleMatcher:
+    """
+    Deletion neighbourhood index of the words of a handle, answering which of them are within a levenshtein distance
+    of 1 to a word without computing any edit distance.
+    Two words are within distance 1 if they are equal, if deleting one character of one gives the other, or if
+    deleting the character at the same position of both gives the same string (substitution).
+
+    Args:
+        handle_words: list of words of the handle, duplicates count multiple times.
+
+    Attributes:
+        counts: number of occurrences of every handle word.
+        lengths: lengths a word can have to be within distance 1 of a handle word.
+        deletions: handle words by the strings resulting from deleting one of their characters.
+        substitutions: handle words by the strings resulting from deleting one of their characters and its position.
+        results: memoized counts of the words matched so far, comments repeat their words a lot.
+    """
+
+    def __init__(self, handle_words: list):
+        self.counts = {}
+        self.lengths = set()
+        self.deletions = {}
+        self.substitutions = {}
+        self.results = {}
+        for word in handle_words:
+            self.counts[word] = self.counts.get(word, 0) + 1
+            self.lengths.update((len(word) - 1, len(word), len(word) + 1))
+        for word in self.counts:
+            for i in range(len(word)):
+                deleted = word[:i] + word[i + 1:]
+                self.deletions.setdefault(deleted, set()).add(word)
+                self.substitutions.setdefault((deleted, i), set()).add(word)
+
+    def count(self, word: str) -> int:
+        """
+        Count the handle words within a levenshtein distance of 1 to a word.
+
+        Args:
+            word: word to match
+
+        Returns:
+            number of matching handle words, counting duplicates.
+        """
+        if len(word) not in self.lengths:
+            return 0
+        if word in self.results:
+            return self.results[word]
+        matches = set()
+        if word in self.counts:
+            matches.add(word)
+        # handle words one character longer than the word
+        matches.update(self.deletions.get(word, ()))
+        for i in range(len(word)):
+            deleted = word[:i] + word[i + 1:]
+            # handle words one character shorter than the word
+            if deleted in self.counts:
+                matches.add(deleted)
+            # handle words of the same length with one different character
+            matches.update(self.substitutions.get((deleted, i), ()))
+        self.results[word] = sum(self.counts[match] for match in matches)
+        return self.results[word]
+
+
 def is_commented_code(comment) -> int:
     """
     Helper function for determining if a comment might be commented code.
@@ -346,23 +528,430 @@ def is_commented_code(comment) -> int:
     return 0
 
 
-def main(project: str, output: str, models: str):
+def is_ignored(comment) -> bool:
+    """
+    Helper function to determine if the evaluator will ignore a rated comment, like comment_evaluator.is_ignore.
+    Headers, commented code, non-english and too short comments get ignored.
+
+    Args:
+        comment: Comment object with its type, language, word count and commented code flag.
+
+    Returns:
+        True if ignored, False otherwise.
+    """
+    return comment.type == "header" or comment.is_code == 1 or comment.language[0] != "en" or \
+        comment.language[1] < 0.75 or comment.n_words < 3
+
+
+def get_missing_corpora(counts_only: bool = False) -> list:
+    """
+    Looks up the NLTK data the rater needs in the local NLTK data directories, without any network access.
+    WordNet is only needed for the synonym analysis if the synonym lexicon was not built, punkt only if the tokenizer
+    keeps the sentences.
+
+    Args:
+        counts_only: Whether the rater only keeps the counts of the tokenizer, which counts sentences without punkt.
+
+    Returns:
+        List of the names of the missing corpora and models.
+    """
+    import nltk
+    corpora = dict(CORPORA)
+    if counts_only:
+        del corpora["punkt"]
+    if not os.path.isfile(LEXICON_PATH):
+        corpora["wordnet"] = ["corpora/wordnet"]
+    missing = []
+    for name, resources in corpora.items():
+        for resource in resources:
+            try:
+                nltk.data.find(resource)
+                break
+            except LookupError:
+                pass
+        else:
+            missing.append(name)
+    return missing
+
+
+def rate_comments(rater: Rater, comments: list, workers: int = 1, batch_size: int = BATCH_SIZE, pool=None):
+    """
+    Rate comments in batches, spread over a pool of forked worker processes if workers > 1.
+    Every distinct text is rated once, comments with the same text (license headers, boilerplate, generated code)
+    get its text fields and only their coherence coefficient is calculated for each.
+    The workers inherit the loaded models of the rater instead of loading them again, and the results are written
+    back into the given comment objects. Without fork (e.g. on Windows) the comments are rated in this process.
+
+    Args:
+        rater: Rater instance with the loaded models.
+        comments: list of comment objects to rate.
+        workers: Number of worker processes.
+        batch_size: Number of comments rated together.
+        pool: Pool of start_rate_pool to rate with, None to fork one for these comments if workers > 1.
+    """
+    start = time.perf_counter()
+    # group the comments by their text, the first one of every group gets rated
+    # when cascading, headers are ignored regardless of their text and do not share it with other comments
+    groups = {}
+    for comment in comments:
+        groups.setdefault((comment.text, rater.cascade and comment.type == "header"), []).append(comment)
+    distinct = [group[0] for group in groups.values()]
+    own_pool = None
+    if pool is None and len(distinct) > batch_size:
+        pool = own_pool = start_rate_pool(rater, workers)
+    if pool is None or len(distinct) <= batch_size:
+        rater.rate_batch(distinct, batch_size)
+    else:
+        batches = [distinct[i:i + batch_size] for i in range(0, len(distinct), batch_size)]
+        try:
+            # results come back in the order of the batches
+            for batch, (rated, timer) in zip(batches, pool.imap(rate_worker, batches)):
+                for comment, result in zip(batch, rated):
+                    comment.__dict__.update(result.__dict__)
+                # collect the stage durations measured by the worker
+                rater.timer.merge(timer)
+        finally:
+            if own_pool:
+                stop_rate_pool(own_pool)
+    # copy the text fields to the duplicates
+    for group in groups.values():
+        for comment in group[1:]:
+            for field in TEXT_FIELDS:
+                setattr(comment, field, getattr(group[0], field))
+            comment.coherence_coefficient = get_coherence_coefficient(comment.words, comment.handle)
+    if rater.cascade:
+        logging.info("Skipped the classification and metrics of %d ignored texts",
+                     sum(1 for comment in distinct if comment.label is None))
+    if comments:
+        logging.info("Rated %d distinct texts for %d comments (%.1f%% duplicates)", len(distinct), len(comments),
+                     (1 - len(distinct) / len(comments)) * 100)
+    seconds = time.perf_counter() - start
+    rater.timer.add("rate", seconds, len(comments))
+    logging.info("Rated %d comments in %.2f seconds (%.1f comments/sec)", len(comments), seconds,
+                 len(comments) / seconds if seconds > 0 else 0)
+
+
+def start_rate_pool(rater: Rater, workers: int):
+    """
+    Fork a pool of worker processes rating with the rater. Everything is loaded before forking, so the workers share
+    it copy-on-write. Fork before starting any threads or process pools, a forked child only inherits the thread
+    that forked it and can deadlock on the locks the others held.
+
+    Args:
+        rater: Rater instance with the models.
+        workers: Number of worker processes.
+
+    Returns:
+        multiprocessing pool, None if workers <= 1 or fork is not available (e.g. on Windows).
+    """
+    global RATER
+    if workers <= 1:
+        return None
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logging.warning("Rating with several workers needs fork, rating in a single process.")
+        return None
+    rater.load()
+    RATER = rater
+    return multiprocessing.get_context("fork").Pool(workers)
+
+
+def stop_rate_pool(pool):
+    """
+    Wait for the worker processes of a pool of start_rate_pool to exit.
+
+    Args:
+        pool: multiprocessing pool.
+    """
+    global RATER
+    pool.close()
+    pool.join()
+    RATER = None
+
+
+def rate_worker(comments: list) -> tuple:
+    """
+    Worker function rating a batch of comments with the inherited rater.
+
+    Args:
+        comments: list of comment objects to rate.
+
+    Returns:
+        Tuple of the rated comment objects and the StageTimer with the durations of rating them.
+    """
+    # only send back the durations of this batch
+    RATER.timer.reset()
+    RATER.rate_batch(comments, len(comments))
+    return comments, RATER.timer
+
+
+def rate_files(project: str, rater: Rater, scraper: CommentScraper, files: list, batch_size: int = BATCH_SIZE,
+               rate_workers: int = 1, chunk_size: int = CHUNK_SIZE):
+    """
+    Generator scraping and rating files chunk by chunk, so their results can be stored before the whole run is done.
+
+    Args:
+        project: Path to directory of project to analyze.
+        rater: Rater instance to rate the comments with.
+        scraper: CommentScraper instance to scrape the files with.
+        files: List of file paths relative to project.
+        batch_size: Number of comments rated together.
+        rate_workers: Number of worker processes rating the comments.
+        chunk_size: Number of comments scraped before they are rated.
+
+    Returns:
+        Generator of lists of tuples (file, rated comment objects, missing comments), in the order of the files.
+    """
+    chunk = []
+    n = 0
+    # fork the rating workers once, before the scraper starts its process pool and threads
+    pool = start_rate_pool(rater, rate_workers)
+    try:
+        start = time.perf_counter()
+        for file, found, missing in scraper.iter_files_comments(project, files):
+            chunk.append((file, found, missing))
+            n += len(found)
+            if n >= chunk_size:
+                rater.timer.add("scrape", time.perf_counter() - start, n)
+                rate_comments(rater, [comment for file, found, missing in chunk for comment in found], rate_workers,
+                              batch_size, pool)
+                yield chunk
+                chunk = []
+                n = 0
+                start = time.perf_counter()
+        if chunk:
+            rater.timer.add("scrape", time.perf_counter() - start, n)
+            rate_comments(rater, [comment for file, found, missing in chunk for comment in found], rate_workers,
+                          batch_size, pool)
+            yield chunk
+    finally:
+        if pool:
+            stop_rate_pool(pool)
+
+
+def merge_files(files: list, results: dict) -> dict:
+    """
+    Helper to merge the results of files in file order and renumber their comments, so the ids do not depend on the
+    order the files were scraped in.
+
+    Args:
+        files: List of file paths relative to the project.
+        results: dict of files and tuples of their found comment objects and missing comments, failed files are left
+            out.
+
+    Returns:
+        dict consisting of "comments" and "missing_comments" like CommentScraper.get_directory_comments.
+    """
+    comments = []
+    missing_comments = []
+    for file in files:
+        if file not in results:
+            continue
+        found, missing = results[file]
+        for comment in found:
+            comment.id = len(comments)
+            comments.append(comment)
+        missing_comments += missing
+    return {"comments": comments, "missing_comments": missing_comments}
+
+
+def rate_cached(project: str, rater: Rater, scraper: CommentScraper, cache: CommentCache,
+                batch_size: int = BATCH_SIZE, rate_workers: int = 1) -> dict:
+    """
+    Scrape and rate the comments of a project, serving all files with unchanged content from the cache.
+    Only the changed files are scraped and rated, and their results are added to the cache chunk by chunk.
+
+    Args:
+        project: Path to directory of project to analyze.
+        rater: Rater instance to rate the comments of changed files with.
+        scraper: CommentScraper instance to scrape the changed files with.
+        cache: CommentCache instance to look up and store the files in.
+        batch_size: Number of comments rated together.
+        rate_workers: Number of worker processes rating the comments.
+
+    Returns:
+        dict consisting of "comments" and "missing_comments" like CommentScraper.get_directory_comments.
+    """
+    timer = rater.timer
+    start = time.perf_counter()
+    files = scraper.path_filter.list_files(project)
+    timer.add("list_files", time.perf_counter() - start, len(files))
+    results = {}
+    keys = {}
+    # look up every file in the cache
+    start = time.perf_counter()
+    for file in files:
+        keys[file] = cache.key(os.path.join(project, file))
+        entry = cache.get(keys[file])
+        if entry is not None:
+            found, missing = entry
+            # the same content may be cached under a different path
+            for comment in found:
+                comment.path = file
+            for m in missing:
+                m["file"] = file
+            results[file] = (found, missing)
+    timer.add("cache", time.perf_counter() - start, len(files))
+    # scrape, rate and cache the changed files
+    changed = [file for file in files if file not in results]
+    for chunk in rate_files(project, rater, scraper, changed, batch_size, rate_workers):
+        for file, found, missing in chunk:
+            results[file] = (found, missing)
+            cache.put(keys[file], found, missing)
+    cache.evict()
+    return merge_files(files, results)
+
+
+def rate_checkpointed(project: str, rater: Rater, scraper: CommentScraper, checkpoint: CommentCheckpoint,
+                      resume: bool = False, batch_size: int = BATCH_SIZE, rate_workers: int = 1) -> dict:
+    """
+    Scrape and rate the comments of a project, appending the results to a checkpoint chunk by chunk.
+    When resuming, the files completed by an earlier run that did not change since are served from the checkpoint.
+
+    Args:
+        project: Path to directory of project to analyze.
+        rater: Rater instance to rate the comments with.
+        scraper: CommentScraper instance to scrape the files with.
+        checkpoint: CommentCheckpoint instance to append the files to.
+        resume: Whether to continue the existing checkpoint instead of starting a new one.
+        batch_size: Number of comments rated together.
+        rate_workers: Number of worker processes rating the comments.
+
+    Returns:
+        dict consisting of "comments" and "missing_comments" like CommentScraper.get_directory_comments.
+    """
+    files = scraper.path_filter.list_files(project)
+    signatures = {file: get_signature(os.path.join(project, file)) for file in files}
+    results = {}
+    try:
+        for file, (signature, found, missing) in checkpoint.open(resume).items():
+            if signatures.get(file) == signature:
+                results[file] = (found, missing)
+        if resume:
+            logging.info("Resuming with %d of %d files completed", len(results), len(files))
+        for chunk in rate_files(project, rater, scraper, [file for file in files if file not in results], batch_size,
+                                rate_workers):
+            for file, found, missing in chunk:
+                results[file] = (found, missing)
+                checkpoint.append(file, signatures[file], found, missing)
+            checkpoint.sync()
+    finally:
+        checkpoint.close()
+    return merge_files(files, results)
+
+
+def rate_project(project: str, models: str, workers: int = 1, timeout: float = None, cache: str = None,
+                 cache_size: int = 1024, backend: str = "srcml", archive: str = None,
+                 extensions: tuple = SOURCE_EXTENSIONS, max_size: int = None, gitignore: bool = True,
+                 ignore_file: str = IGNORE_FILE, batch_size: int = BATCH_SIZE, rate_workers: int = 1,
+                 counts_only: bool = False, cascade: bool = False, checkpoint: str = None, resume: bool = False,
+                 timer: StageTimer = None) -> dict:
+    """
+    Scrape a project directory for comments and rate them, without writing any files.
+
+    Args:
+        project: Path to directory of project to analyze.
+        models: Path to directory containing the comment classification models.
+        workers: Number of worker processes running srcML.
+        timeout: Seconds srcML may spend on a single file when running with several workers.
+        cache: Path to the cache directory of scraped and rated files, None to disable the cache.
+        cache_size: Maximum size of the cache in megabytes.
+        backend: Backend for extracting the comments, 'srcml' or the built-in 'lexer'.
+        archive: Path to a directory for keeping the compressed srcML output for reuse, None to disable.
+        extensions: File extensions to scrape, all other files are skipped.
+        max_size: Maximum size of a file to scrape in kilobytes, None for no limit.
+        gitignore: Whether files ignored by the .gitignore files of the project are skipped.
+        ignore_file: Name of the ignore file in the project root with additional rules, None to disable.
+        batch_size: Number of comments rated together.
+        rate_workers: Number of worker processes rating the comments, sharing the loaded models through fork.
+        counts_only: Only keep the counts of complex words, syllables and sentences, not their lists, sentences
+            are counted with a regex instead of NLTK.
+        cascade: Skip the classification, readability metrics and synonyms of comments the evaluator ignores.
+        checkpoint: Path to a file checkpointing the rated comments of every file, None to disable. Not used together
+            with the cache, which keeps them as well.
+        resume: Continue the run of the checkpoint, skipping the files it completed.
+        timer: StageTimer instance collecting the durations of the stages, None for a new one.
+
+    Returns:
+        dict consisting of the rated "comments" and the "missing_comments" like CommentScraper.get_directory_comments.
+    """
+    # check for the NLTK data, without downloading anything
+    missing = get_missing_corpora(counts_only)
+    if missing:
+        logging.error("The NLTK data %s is not installed, install it with: python -m nltk.downloader %s",
+                      ", ".join(missing), " ".join(missing))
+        exit(1)
+    if resume and not checkpoint:
+        logging.error("Resuming needs the path of the checkpoint.")
+        exit()
+
+    # instantiate Objects
+    timer = timer or StageTimer()
+    with timer.stage("load"):
+        r = Rater(models, counts_only, timer, cascade)
+    f = PathFilter(extensions, None if max_size is None else max_size * 1024, gitignore, ignore_file)
+    s = CommentScraper(workers, timeout, backend, archive, f)
+    if cache:
+        # only scrape and rate files that changed since they were cached
+        c = CommentCache(cache, get_version(models, backend, counts_only, cascade), cache_size * 1024 * 1024)
+        all_comments = rate_cached(project, r, s, c, batch_size, rate_workers)
+        logging.info("Cache: %d hits, %d misses", c.hits, c.misses)
+        if checkpoint:
+            logging.warning("The cache already keeps the rated files, not writing the checkpoint %s.", checkpoint)
+    elif checkpoint:
+        # append the rated comments to the checkpoint file by file
+        p = CommentCheckpoint(checkpoint, get_version(models, backend, counts_only, cascade))
+        all_comments = rate_checkpointed(project, r, s, p, resume, batch_size, rate_workers)
+    else:
+        # fetch found and missing comments with the Scraper class
+        start = time.perf_counter()
+        all_comments = s.get_directory_comments(project)
+        timer.add("scrape", time.perf_counter() - start, len(all_comments["comments"]))
+        # rate the found comments with the Rater class
+        rate_comments(r, all_comments["comments"], rate_workers, batch_size)
+    logging.info("Skipped %d files (%d bytes) and %d ignored directories", f.skipped_files, f.skipped_bytes,
+                 f.skipped_dirs)
+    return all_comments
+
+
+def main(project: str, output: str, models: str, workers: int = 1, timeout: float = None, cache: str = None,
+         cache_size: int = 1024, backend: str = "srcml", archive: str = None,
+         extensions: tuple = SOURCE_EXTENSIONS, max_size: int = None, gitignore: bool = True,
+         ignore_file: str = IGNORE_FILE, batch_size: int = BATCH_SIZE, rate_workers: int = 1,
+         counts_only: bool = False, cascade: bool = False, lean: bool = False, checkpoint: str = None,
+         resume: bool = False, stats: str = None, timer: StageTimer = None):
     """
     Scrape a project directory for comments and rate their contents/data.
 
     Args:
         project: Path to directory of project to analyze.
-        output: Path to output file.
+        output: Path to output file, a .parquet file is written typed and a .csv file otherwise.
         models: Path to directory containing the comment classification models.
+        workers: Number of worker processes running srcML.
+        timeout: Seconds srcML may spend on a single file when running with several workers.
+        cache: Path to the cache directory of scraped and rated files, None to disable the cache.
+        cache_size: Maximum size of the cache in megabytes.
+        backend: Backend for extracting the comments, 'srcml' or the built-in 'lexer'.
+        archive: Path to a directory for keeping the compressed srcML output for reuse, None to disable.
+        extensions: File extensions to scrape, all other files are skipped.
+        max_size: Maximum size of a file to scrape in kilobytes, None for no limit.
+        gitignore: Whether files ignored by the .gitignore files of the project are skipped.
+        ignore_file: Name of the ignore file in the project root with additional rules, None to disable.
+        batch_size: Number of comments rated together.
+        rate_workers: Number of worker processes rating the comments, sharing the loaded models through fork.
+        counts_only: Only export the counts of complex words, syllables and sentences, not their lists, sentences
+            are counted with a regex instead of NLTK.
+        cascade: Skip the classification, readability metrics and synonyms of comments the evaluator ignores.
+        lean: Leave out the token lists of the comments (words, complex words, syllables and sentences).
+        checkpoint: Path to a file checkpointing the rated comments of every file, None to disable.
+        resume: Continue the run of the checkpoint, skipping the files it completed.
+        stats: Path to a .json file for the durations of the stages, None to disable.
+        timer: StageTimer instance collecting the durations of the stages, None for a new one.
 
     Returns:
-        Creates a .csv file at the output location with the data of all found comments and one .csv.missing file with
-        the missing comments' data.
+        Creates a .csv or .parquet file at the output location with the data of all found comments and one _missing
+        file of the same format with the missing comments' data.
     """
 
-    # import and update/download the wordnet data
-    import nltk
-    nltk.download('wordnet')
     # check if project is a proper directory
     if not os.path.isdir(project):
         logging.error("The project directory does not exist.")
@@ -372,24 +961,35 @@ def main(project: str, output: str, models: str):
         logging.error("The models directory does not exist.")
         exit()
 
-    # instantiate Objects
-    r = Rater(models)
-    s = CommentScraper()
-    e = CommentExporter()
-    # fetch found and missing comments with the Scraper class
-    all_comments = s.get_directory_comments(project)
+    timer = timer or StageTimer()
+    all_comments = rate_project(project, models, workers, timeout, cache, cache_size, backend, archive, extensions,
+                                max_size, gitignore, ignore_file, batch_size, rate_workers, counts_only, cascade,
+                                checkpoint, resume, timer)
     comments = all_comments["comments"]
-    missing_comments = all_comments["missing_comments"]
-    # rate the found comments with the Rater class
-    r.rate(comments)
     # Export the missing and found comments with the Exporter class
+    start = time.perf_counter()
+    e = CommentExporter(lean)
     e.export_comments(comments, output)
-    # Get filename for missing comments
+    e.export_missing_comments(all_comments["missing_comments"], get_missing_path(output))
+    timer.add("export", time.perf_counter() - start, len(comments))
+    if stats:
+        timer.write(stats)
+
+
+def get_missing_path(output: str) -> str:
+    """
+    Helper function to get the path of the missing comments' file next to the found comments' file.
+
+    Args:
+        output: Path to the found comments' file.
+
+    Returns:
+        Path with '_missing' appended to the filename, keeping the extension.
+    """
     res_path, res_filename = os.path.split(output)
-    res_filename = os.path.splitext(res_filename)[0]
-    missing_filename = '%s_missing.csv' % res_filename
-    missing_file_path = os.path.join(res_path, missing_filename)
-    e.export_missing_comments(missing_comments, missing_file_path)
+    res_filename, res_extension = os.path.splitext(res_filename)
+    missing_filename = '%s_missing%s' % (res_filename, res_extension)
+    return os.path.join(res_path, missing_filename)
 
 
 if __name__ == '__main__':
@@ -399,11 +999,48 @@ if __name__ == '__main__':
                         help='Path to the project directory to scrape for comments.')
 
     parser.add_argument('output', metavar='Output', type=str,
-                        help='Path for the output .csv file')
+                        help='Path for the output .csv file, or a typed .parquet file')
 
     parser.add_argument('models', metavar='Models', type=str,
                         help='Path to the directory of the trained models for comment type classification.')
     # optional arguments
+    parser.add_argument("-workers", "--workers", type=int, default=1,
+                        help="Number of processes running srcML file by file. Example --workers 8, default=1")
+    parser.add_argument("-timeout", "--timeout", type=float, default=None,
+                        help="Seconds srcML may spend on a single file when using several workers. Example --timeout 60")
+    parser.add_argument("-cache", "--cache", type=str, default=None,
+                        help="Path to a directory for caching the results of unchanged files between runs.")
+    parser.add_argument("-cache_size", "--cache_size", type=int, default=1024,
+                        help="Maximum size of the cache in megabytes. Example --cache_size 512, default=1024")
+    parser.add_argument("-backend", "--backend", default="srcml", choices=BACKENDS,
+                        help="Extract comments with srcML or the faster built-in lexer. Example --backend lexer, default='srcml'")
+    parser.add_argument("-archive", "--archive", type=str, default=None,
+                        help="Path to a directory for keeping the compressed srcML output and reusing it while the files are unchanged. Only used with one worker, the srcml backend and no cache or checkpoint.")
+    parser.add_argument("-extensions", "--extensions", type=str, nargs="+", default=list(SOURCE_EXTENSIONS),
+                        help="File extensions to scrape. Example --extensions .java .cs, default=all supported")
+    parser.add_argument("-max_size", "--max_size", type=int, default=None,
+                        help="Skip files larger than this size in kilobytes, e.g. generated code. Example --max_size 512")
+    parser.add_argument("-gitignore", "--gitignore", type=int, default=1, choices=[0, 1],
+                        help="Skip the files ignored by the .gitignore files of the project. Example --gitignore 0, default=1")
+    parser.add_argument("-ignore_file", "--ignore_file", type=str, default=IGNORE_FILE,
+                        help="Name of an ignore file in the project root with .gitignore syntax. default='%s'" % IGNORE_FILE)
+    parser.add_argument("-batch_size", "--batch_size", type=int, default=BATCH_SIZE,
+                        help="Number of comments rated together. Example --batch_size 1024, default=%d" % BATCH_SIZE)
+    parser.add_argument("-rate_workers", "--rate_workers", type=int, default=1,
+                        help="Number of processes rating the comments, needs fork. Example --rate_workers 8, default=1")
+    parser.add_argument("-counts_only", "--counts_only", type=int, default=0, choices=[0, 1],
+                        help="Only export the counts of complex words, syllables and sentences, not their lists. "
+                             "Sentences are counted with a regex, which can differ from NLTK. default=0")
+    parser.add_argument("-cascade", "--cascade", type=int, default=0, choices=[0, 1],
+                        help="Skip the classification, readability and synonyms of comments the evaluator ignores (headers, commented code, non-english, too short). default=0")
+    parser.add_argument("-lean", "--lean", type=int, default=0, choices=[0, 1],
+                        help="Leave out the token lists (words, complex words, syllables, sentences) of the comments. default=0")
+    parser.add_argument("-checkpoint", "--checkpoint", type=str, default=None,
+                        help="Path for a file checkpointing the rated comments file by file. Example --checkpoint run.checkpoint")
+    parser.add_argument("-resume", "--resume", type=int, default=0, choices=[0, 1],
+                        help="Continue the run of the checkpoint, skipping the files it completed. default=0")
+    parser.add_argument("-stats", "--stats", type=str, default=None,
+                        help="Path for a .json file with the durations and throughput of every stage. Example --stats stats.json")
     levels = {
         'critical': logging.CRITICAL,
         'error': logging.ERROR,
@@ -421,6 +1058,9 @@ if __name__ == '__main__':
     logging.basicConfig(format='%(asctime)s -%(levelname)s- [%(filename)s:%(lineno)d] \n \t %(message)s',
                         level=level, stream=sys.stdout)
     # run main() function
-    main(args.project, args.output, args.models)
+    main(args.project, args.output, args.models, args.workers, args.timeout, args.cache, args.cache_size,
+         args.backend, args.archive, tuple(args.extensions), args.max_size, bool(args.gitignore), args.ignore_file,
+         args.batch_size, args.rate_workers, bool(args.counts_only), bool(args.cascade), bool(args.lean),
+         args.checkpoint, bool(args.resume), args.stats)
 
     exit()
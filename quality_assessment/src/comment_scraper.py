@@ -19,160 +19,433 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 # module imports
+import gzip
+import hashlib
+import io
 import logging
+import multiprocessing
 import os
 import subprocess
-import xml.dom.minidom as xml
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import xml.etree.ElementTree as ET
 # import Comment Object
 from quality_assessment.src.comment_object import Comment
+from quality_assessment.src.comment_lexer import scrape_file
+from quality_assessment.src.path_filter import PathFilter
 
 COMMENT_TYPES = ["class", "function", "constructor", "interface", "enum"]
 """List of different possible types of comments"""
 
+SRC_NS = "{http://www.srcML.org/srcML/src}"
+"""Namespace of the srcML source elements"""
+POS_START = "{http://www.srcML.org/srcML/position}start"
+"""Qualified name of the srcML 'pos:start' attribute"""
+
+SHARDS_PER_WORKER = 4
+"""Number of shards each worker gets on average, smaller shards balance the load better"""
+
+BACKENDS = ["srcml", "lexer"]
+"""Available backends for extracting comments: srcML or the built-in lexer"""
+
 
 class CommentScraper:
     """
     Class for scraping comments of a directory through srcML and instantiate them with basic fields
 
+    Args:
+        workers: number of worker processes running srcML. With 1 the whole directory is passed to a single srcML call.
+        timeout: seconds srcML may spend on a single file when scraping with several workers, None for no limit.
+        backend: one of BACKENDS, 'lexer' extracts comments with the built-in lexer instead of srcML.
+        archive: path to a directory for keeping the compressed srcML output of a directory for reuse, None to disable.
+            Only used by get_directory_comments with one worker and the srcml backend.
+        path_filter: PathFilter selecting the files of a directory to scrape, None for the default rules.
+
     Attributes:
         id: keep track and increment the id of found comments
     """
 
-    def __init__(self):
+    def __init__(self, workers: int = 1, timeout: float = None, backend: str = "srcml", archive: str = None,
+                 path_filter: PathFilter = None):
         # start id at 0
         self.id = 0
+        self.workers = workers
+        self.timeout = timeout
+        self.backend = backend
+        self.archive = archive
+        self.path_filter = path_filter or PathFilter()
 
     def get_directory_comments(self, dir: str) -> dict:
         """
-        Get all comments in all files in a directory.
+        Get all comments in all files in a directory that pass the path filter.
+        The srcML output is read from its stdout and parsed as a stream, so only one file ('unit') is held in memory
+        at a time and nothing is written into the directory.
+        With several workers or the lexer backend the files are scraped one by one and the archive is not used.
 
         Args:
             dir: path to parent directory to scrape for comments.
 
         Returns: dict consisting of "comments" and "missing_comments" consisting of comment objects.
         """
+        files = self.path_filter.list_files(dir)
+        if self.workers > 1 or self.backend == "lexer":
+            return self.get_files_comments(dir, files)
         found_comments = []
         missing_comments = []
-        # run srcML on dir, saving it to export.xml temporarily
-        p = subprocess.Popen('srcml . -o export.xml --position', shell=True, cwd=dir)
-        p.wait()
-        doc = None
+        if not files:
+            return {"comments": found_comments, "missing_comments": missing_comments}
+        archive = None
+        if self.archive:
+            archive = os.path.join(self.archive, get_archive_key(dir, files) + ".xml.gz")
+            if os.path.isfile(archive):
+                # the files did not change since the archive was written
+                logging.info("Reusing srcML archive %s", archive)
+                with gzip.open(archive, "rb") as f:
+                    for unit in iter_units(f):
+                        self.scrape_unit(unit, found_comments, missing_comments)
+                return {"comments": found_comments, "missing_comments": missing_comments}
+        # hand the selected files to srcML through a list outside of dir
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file_list:
+            file_list.write("\n".join(files) + "\n")
+        # run srcML on the files and parse its output while it is written
         try:
-            doc = xml.parse(os.path.join(dir, "export.xml"))
+            p = subprocess.Popen(["srcml", "--files-from", file_list.name, "--position"], cwd=dir, stdout=subprocess.PIPE)
         except FileNotFoundError:
             logging.error("srcML needs to be installed and added to PATH or this script has no access to the target directory.")
+            os.remove(file_list.name)
+            return {"comments": found_comments, "missing_comments": missing_comments}
+        stream = p.stdout
+        if archive:
+            # keep a compressed copy of the output, written under a temporary name until srcML is done
+            os.makedirs(self.archive, exist_ok=True)
+            tmp = "%s.%d.tmp" % (archive, os.getpid())
+            stream = TeeReader(p.stdout, gzip.open(tmp, "wb"))
+        try:
+            # scrape one file after the other
+            for unit in iter_units(stream):
+                self.scrape_unit(unit, found_comments, missing_comments)
+        finally:
+            p.stdout.close()
+            p.wait()
+            os.remove(file_list.name)
+            if archive:
+                stream.copy.close()
+                if p.returncode == 0:
+                    os.replace(tmp, archive)
+                else:
+                    os.remove(tmp)
+        return {"comments": found_comments, "missing_comments": missing_comments}
+
+    def get_files_comments(self, dir: str, files: list) -> dict:
+        """
+        Get all comments in a list of files, running the backend file by file in a pool of worker processes.
+        The files are split into shards and the results are merged in the order of the list, so the comment ids
+        do not depend on which worker finishes first.
 
-        # get all files found
-        files = doc.getElementsByTagName("unit")
-        # iterate through them
-        for file in files:
-            # get comment text & line position
-            file_path = file.getAttribute("filename")
-            if file_path == "":
+        Args:
+            dir: path to parent directory the files are relative to.
+            files: list of file paths relative to dir.
+
+        Returns: dict consisting of "comments" and "missing_comments" consisting of comment objects.
+        """
+        found_comments = []
+        missing_comments = []
+        for file, found, missing in self.iter_files_comments(dir, files):
+            found_comments += found
+            missing_comments += missing
+        return {"comments": found_comments, "missing_comments": missing_comments}
+
+    def iter_files_comments(self, dir: str, files: list):
+        """
+        Generator scraping a list of files and yielding the results file by file, in the order of the list.
+        Files srcML failed on or timed out on are left out.
+
+        Args:
+            dir: path to parent directory the files are relative to.
+            files: list of file paths relative to dir.
+
+        Returns:
+            Generator of tuples (file, found comment objects, missing comments).
+        """
+        if self.archive:
+            # the archive holds the output of a single srcML run over the whole directory
+            logging.warning("The srcML archive is only used when scraping a whole directory with one worker and the "
+                            "srcml backend, not keeping or reusing %s.", self.archive)
+        size = max(1, -(-len(files) // (max(1, self.workers) * SHARDS_PER_WORKER)))
+        shards = [files[i:i + size] for i in range(0, len(files), size)]
+        executor = None
+        if self.workers > 1:
+            # forked workers would inherit the threads of a running rating pool, a forkserver starts them clean
+            context = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(context))
+        try:
+            mapper = executor.map if executor else map
+            for shard in mapper(scrape_shard, [dir] * len(shards), shards, [self.timeout] * len(shards),
+                                [self.backend] * len(shards)):
+                for file, found, missing in shard:
+                    # renumber the comments in merge order
+                    for comment in found:
+                        comment.id = self.id
+                        self.id += 1
+                    yield file, found, missing
+        finally:
+            if executor:
+                executor.shutdown()
+
+    def scrape_unit(self, file, found_comments: list, missing_comments: list):
+        """
+        Get all found and missing comments of a single srcML unit (file).
+
+        Args:
+            file: srcML 'unit' element of a file.
+            found_comments: list to append the found comment objects to.
+            missing_comments: list to append the missing comments to.
+        """
+        file_path = file.get("filename", "")
+        code_language = file.get("language", "")
+        children = list(file)
+        # first element should be a (license) comment in every file
+        if len(children) == 0 or tag(children[0]) != "comment":
+            missing_comments.append({"file": file_path, "pos": '1:1', "name": "", "type": "header"})
+        # walk the file once in document order, keeping a stack of [children, index, checked] for the open elements.
+        # 'checked' marks the children that are checked for missing comments: the ones of the file and of the first
+        # block nested in an element that lacks a comment
+        stack = [[children, 0, True]]
+        # stack height at which the subtree of an element lacking a comment ends, while its first block is searched
+        pending = None
+        while stack:
+            frame = stack[-1]
+            children, i, checked = frame
+            if i >= len(children):
+                stack.pop()
+                if pending is not None and len(stack) < pending:
+                    pending = None
+                continue
+            element = children[i]
+            name = tag(element)
+            if name != "comment":
+                frame[1] = i + 1
+                lacks_comment = False
+                # check that an element that is part of COMMENT_TYPES has a comment
+                if checked and i >= 1 and name in COMMENT_TYPES and not (i > 1 and tag(children[i - 1]) == "comment"):
+                    missing_comments.append({"file": file_path, "pos": element.get(POS_START, ""),
+                                             "name": get_handle(element), "type": name})
+                    lacks_comment = True
+                check_children = False
+                if name == "block" and pending is not None:
+                    check_children = True
+                    pending = None
+                # descend into the element
+                stack.append([list(element), 0, check_children])
+                if lacks_comment:
+                    pending = len(stack)
                 continue
-            # get all comment elements in file and code language
-            comments = file.getElementsByTagName("comment")
-            code_language = file.getAttribute("language")
-            # iterate through all comments in file
-            i = 0
-            while i < (len(comments)):
-                comment = comments[i]
-                # get position
-                line = comment.getAttribute("pos:start")
-                # get text
-                text = comment.firstChild.nodeValue
-
-                sibling = None
-                try:
-                    sibling = comment.nextSibling if comment.nextSibling.nodeType == 1 else comment.nextSibling.nextSibling
-                except:
-                    # comment at end of file -> no siblings
-                    pass
-
-                # concatenate comments that are together in the source code
-                while sibling and sibling.tagName == "comment":
-                    text += '\\n' + sibling.firstChild.nodeValue
-                    i = i + 1
-                    try:
-                        sibling = sibling.nextSibling if sibling.nextSibling.nodeType == 1 else sibling.nextSibling.nextSibling
-                    except:
-                        sibling = None
-                        pass
-                # default is in-line comment
-                typ = "in-line"
-                handle = None
-                # if at start of file it is a header comment
-                if line == "1:1":
-                    typ = "header"
-                # if the next element is a valid comment type, write it to typ
-                if sibling and sibling.tagName in COMMENT_TYPES:
-                    typ = sibling.tagName
-                    handle = get_handle(sibling)
-                # discard empty comments
-                if text.replace("\n", "").strip() != "":
-                    # instantiate and append comment
-                    found_comments.append(Comment(self.id, file_path, line, typ, text, handle, code_language))
-                    self.id += 1
+            # get position
+            line = element.get(POS_START, "")
+            # get text
+            text = element.text or ""
+            i += 1
+            # concatenate comments that are together in the source code
+            while i < len(children) and tag(children[i]) == "comment":
+                text += '\\n' + (children[i].text or "")
                 i += 1
-            children = file.childNodes
-            # only look at "Elements" which has node type 1
-            children = [child for child in children if child.nodeType == 1]
-            # first element should be a (license) comment in every file
-            if children[0].tagName != "comment":
-                missing_comments.append({"file": file_path, "pos": '1:1', "name": "", "type": "header"})
-            # get other missing comments
-            missing_comments += get_missing_comments(children, file_path)
-        # delete temporary srcML file
-        os.remove(os.path.join(dir, "export.xml"))
-        return {"comments": found_comments, "missing_comments": missing_comments}
+            frame[1] = i
+            # element following the comment(s), None if at end of parent
+            sibling = children[i] if i < len(children) else None
+            # default is in-line comment
+            typ = "in-line"
+            handle = None
+            # if at start of file it is a header comment
+            if line == "1:1":
+                typ = "header"
+            # if the next element is a valid comment type, write it to typ
+            if sibling is not None and tag(sibling) in COMMENT_TYPES:
+                typ = tag(sibling)
+                handle = get_handle(sibling)
+            # discard empty comments
+            if text.replace("\n", "").strip() != "":
+                # instantiate and append comment
+                found_comments.append(Comment(self.id, file_path, line, typ, text, handle, code_language))
+                self.id += 1
 
+    def scrape_lexed(self, file_path: str, code_language: str, comments: list, missing: list, found_comments: list,
+                     missing_comments: list):
+        """
+        Get all found and missing comments of a single file from the results of the lexer.
 
-def get_handle(e) -> str:
+        Args:
+            file_path: path of the file.
+            code_language: code language of the file.
+            comments: list of (position, text, type, handle) found by the lexer.
+            missing: list of (position, name, type) found by the lexer.
+            found_comments: list to append the found comment objects to.
+            missing_comments: list to append the missing comments to.
+        """
+        for line, text, sibling, sibling_handle in comments:
+            # default is in-line comment
+            typ = "in-line"
+            handle = None
+            # if at start of file it is a header comment
+            if line == "1:1":
+                typ = "header"
+            # if the next element is a valid comment type, write it to typ
+            if sibling in COMMENT_TYPES:
+                typ = sibling
+                handle = sibling_handle
+            # discard empty comments
+            if text.replace("\n", "").strip() != "":
+                found_comments.append(Comment(self.id, file_path, line, typ, text, handle, code_language))
+                self.id += 1
+        for line, name, typ in missing:
+            missing_comments.append({"file": file_path, "pos": line, "name": name, "type": typ})
+
+
+def scrape_shard(dir: str, files: list, timeout: float = None, backend: str = "srcml") -> list:
     """
-    Helper to get handle of an element.
+    Worker function running srcML or the lexer on each file of a shard and scraping its comments.
+
+    Args:
+        dir: path to parent directory the files are relative to.
+        files: list of file paths relative to dir.
+        timeout: seconds srcML may spend on a single file, None for no limit.
+        backend: one of BACKENDS.
+
+    Returns:
+        list of tuples (file, found comment objects, missing comments) of the scraped files.
+    """
+    scraper = CommentScraper()
+    result = []
+    for file in files:
+        found_comments = []
+        missing_comments = []
+        if backend == "lexer":
+            try:
+                language, comments, missing = scrape_file(dir, file)
+            except OSError:
+                logging.warning("Could not read %s, skipping the file.", file)
+                continue
+            scraper.scrape_lexed(file, language, comments, missing, found_comments, missing_comments)
+            result.append((file, found_comments, missing_comments))
+            continue
+        try:
+            p = subprocess.run(["srcml", file, "--position"], cwd=dir, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logging.warning("srcML timed out on %s, skipping the file.", file)
+            continue
+        except FileNotFoundError:
+            logging.error("srcML needs to be installed and added to PATH or this script has no access to the target directory.")
+            break
+        if p.returncode != 0 or not p.stdout:
+            logging.warning("srcML could not parse %s, skipping the file.", file)
+            continue
+        for unit in iter_units(io.BytesIO(p.stdout)):
+            scraper.scrape_unit(unit, found_comments, missing_comments)
+        result.append((file, found_comments, missing_comments))
+    return result
+
+
+class TeeReader:
+    """
+    Binary stream wrapper writing a copy of everything that is read from it into another file.
+
+    Args:
+        stream: binary stream to read from.
+        copy: binary file to write the copy to.
+    """
+
+    def __init__(self, stream, copy):
+        self.stream = stream
+        self.copy = copy
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read from the stream and write the data to the copy.
+
+        Args:
+            size: maximum number of bytes to read, -1 for everything.
+
+        Returns:
+            The data read.
+        """
+        data = self.stream.read(size)
+        self.copy.write(data)
+        return data
+
+
+def get_archive_key(dir: str, files: list) -> str:
+    """
+    Helper to calculate the key of a directory's srcML archive from the paths, sizes and modification times of its
+    source files, so any change to them leads to a new archive.
+
+    Args:
+        dir: path to parent directory.
+        files: list of the scraped file paths relative to dir.
+
+    Returns:
+        Hex digest of the key.
+    """
+    h = hashlib.sha256(os.path.abspath(dir).encode())
+    for file in files:
+        stat = os.stat(os.path.join(dir, file))
+        h.update(("%s\0%d\0%d\n" % (file, stat.st_size, stat.st_mtime_ns)).encode())
+    return h.hexdigest()
+
+
+def iter_units(source):
+    """
+    Generator streaming the file units of a srcML document. Every unit is yielded once it is fully parsed and
+    discarded afterwards, which keeps the memory bound to the largest single file instead of the whole document.
+
+    Args:
+        source: path or binary file object of a srcML document.
+
+    Returns:
+        Generator of srcML 'unit' elements that belong to a file.
+    """
+    # stack of currently open elements, needed to detach finished units from their parent
+    stack = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        # the root unit of an archive has no filename
+        if tag(elem) != "unit" or elem.get("filename", "") == "":
+            continue
+        yield elem
+        # free the processed unit
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+def tag(e) -> str:
+    """
+    Helper to get the tag name of an element without its namespace.
 
     Args:
         e: XML element.
 
     Returns:
-        handle of element e.
+        tag name of element e.
     """
-    attrs = e.childNodes
-    name = ""
-    for attr in attrs:
-        if attr.nodeType == 1 and attr.tagName == "name":
-            name = attr.firstChild.nodeValue
-    return name
+    return e.tag[len(SRC_NS):] if e.tag.startswith(SRC_NS) else e.tag.rpartition("}")[2]
 
 
-def get_missing_comments(c, file_path: str) -> list:
+def get_handle(e) -> str:
     """
-    Recursive function for checking a srcML XML for elements that lack a comment.
+    Helper to get handle of an element.
 
     Args:
-        c: children of an XML element
-        file_path: path of comment for writing.
+        e: XML element.
 
     Returns:
-        List of missing comments consisting of 'file', 'pos', 'name' and 'type'
+        handle of element e.
     """
-    # only look at "Elements" which have node type 1
-    children = [child for child in c if child.nodeType == 1]
-    missing_comments = []
-    for i in range(1, len(children)):
-        # check that an element that is part of COMMENT_TYPES has a comment
-        if children[i].tagName in COMMENT_TYPES:
-            # missing comment
-            if not (i > 1 and children[i - 1].tagName == "comment"):
-                name = get_handle(children[i])
-                line = children[i].getAttribute("pos:start")
-                # add missing comment
-                missing_comments.append(
-                    {"file": file_path, "pos": line, "name": name, "type": children[i].tagName})
-                # recursive call
-                try:
-                    missing_comments += get_missing_comments(children[i].getElementsByTagName("block")[0].childNodes,
-                                                             file_path)
-                except IndexError:
-                    pass
-    return missing_comments
+    name = ""
+    for attr in e:
+        if tag(attr) == "name":
+            name = attr.text
+    return name
+
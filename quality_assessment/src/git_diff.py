@@ -0,0 +1,134 @@
+"""
+Copyright (c) 2021 Tim Moser.
+
+This file is part of coality
+(see https://github.com/TimDeanMoser/coality).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+from git import Repo
+from quality_assessment.src.comment_evaluator import COLUMN_AGG, valid_file
+
+
+def get_changed_files(project: str, base: str, head: str) -> list:
+    """
+    Get all files with a valid extension that were added, modified, deleted or renamed between two revisions.
+
+    Args:
+        project: Path to the git repository.
+        base: Base revision (e.g. a branch, tag or commit hash).
+        head: Head revision.
+
+    Returns:
+        Sorted list of file paths relative to the repository root.
+    """
+    repo = Repo(project)
+    files = set()
+    for d in repo.commit(base).diff(repo.commit(head)):
+        # renamed files show up under both paths
+        for path in (d.a_path, d.b_path):
+            if path and valid_file(path):
+                files.add(path)
+    return sorted(files)
+
+
+def export_revision(project: str, rev: str, files: list, dest: str) -> list:
+    """
+    Write the content of files at a revision into a directory, keeping their relative paths.
+    Files that do not exist at the revision are skipped.
+
+    Args:
+        project: Path to the git repository.
+        rev: Revision to export.
+        files: List of file paths relative to the repository root.
+        dest: Path to the directory to write the files into.
+
+    Returns:
+        List of the exported file paths.
+    """
+    tree = Repo(project).commit(rev).tree
+    exported = []
+    for file in files:
+        try:
+            blob = tree / file
+        except KeyError:
+            # added or deleted between the revisions
+            continue
+        path = os.path.join(dest, file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(blob.data_stream.read())
+        exported.append(file)
+    return exported
+
+
+def get_file_metrics(result) -> dict:
+    """
+    Collect the aggregated metrics of all files in an evaluator result.
+
+    Args:
+        result: Dict generated by CommentEvaluator.path_to_dict for the exported directory.
+
+    Returns:
+        Dict with file paths relative to the directory as keys and dicts of their metrics as values.
+    """
+    metrics = {}
+    if result is None:
+        return metrics
+    # stack of (node, path of node relative to the root)
+    stack = [(child, child["name"]) for child in result.get("children", [])]
+    while stack:
+        node, path = stack.pop()
+        if node["structure"] == "file":
+            metrics[path] = {key: node[key] for key in COLUMN_AGG.keys()}
+        else:
+            stack += [(child, path + "/" + child["name"]) for child in node["children"]]
+    return metrics
+
+
+def get_delta_report(base: str, head: str, files: list, base_metrics: dict, head_metrics: dict) -> dict:
+    """
+    Compare the metrics of the touched files at two revisions.
+
+    Args:
+        base: Base revision.
+        head: Head revision.
+        files: List of touched file paths.
+        base_metrics: Metrics of the files at the base revision, see get_file_metrics.
+        head_metrics: Metrics of the files at the head revision, see get_file_metrics.
+
+    Returns:
+        Dict holding the revisions and for every touched file its status, metrics at both revisions and their delta.
+    """
+    report = {"base": base, "head": head, "files": {}}
+    for file in files:
+        b = base_metrics.get(file)
+        h = head_metrics.get(file)
+        if b is None and h is None:
+            # neither revision has any comment data for the file
+            continue
+        status = "added" if b is None else "deleted" if h is None else "modified"
+        delta = {}
+        for key in COLUMN_AGG.keys():
+            old = b.get(key) if b else None
+            new = h.get(key) if h else None
+            if COLUMN_AGG[key] == "mean":
+                # a mean of a file without rated comments is unknown, not zero
+                delta[key] = new - old if new is not None and old is not None else None
+            else:
+                delta[key] = (new or 0) - (old or 0)
+        report["files"][file] = {"status": status, "base": b, "head": h, "delta": delta}
+    return report
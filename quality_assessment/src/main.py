@@ -20,35 +20,72 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 """
 This file parses the arguments and runs the main() function, which analyses the quality of a project's comments.
+If a base revision is given, only the files touched between the base and head revision are analyzed and the output is
+a report of how their metrics changed.
 For a smooth performance, make sure that the root of the repository is the working directory when running the script and use absolute paths as the arguments.
 
 Example:
     $ python main.py C:\\my_project output.json C:\\my_models -log debug
+    $ python main.py C:\\my_project delta.json C:\\my_models -base main -head feature
 """
 # import modules
 import argparse
 import logging
 import os
 import sys
-# import evaluator, filter, and rater mains
-from quality_assessment.src.comment_evaluator import main as evaluate
-from quality_assessment.src.comment_filter import main as filter
-from quality_assessment.src.comment_rater import main as rate
-# path to the temporary files folder
-TMP_PATH = r"quality_assessment/src/tmp"
+import tempfile
+import time
+import simplejson
+# import evaluator, filter, exporter and rater
+from quality_assessment.src.comment_evaluator import CommentEvaluator
+from quality_assessment.src.comment_filter import CommentFilter
+from quality_assessment.src.comment_exporter import CommentExporter, write_data
+from quality_assessment.src.comment_rater import rate_project, get_missing_path, BATCH_SIZE
+from quality_assessment.src.comment_scraper import BACKENDS
+from quality_assessment.src.path_filter import SOURCE_EXTENSIONS, IGNORE_FILE
+from quality_assessment.src.stage_timer import StageTimer
+from quality_assessment.src.git_diff import get_changed_files, export_revision, get_file_metrics, get_delta_report
 
 
-def main(project: str, output: str, models: str, syn: int, language: str, label: str):
+def main(project: str, output: str, models: str, syn: int, language: str, label: str, workers: int = 1,
+         timeout: float = None, cache: str = None, cache_size: int = 1024, backend: str = "srcml",
+         archive: str = None, extensions: tuple = SOURCE_EXTENSIONS, max_size: int = None, gitignore: bool = True,
+         ignore_file: str = IGNORE_FILE, batch_size: int = BATCH_SIZE, rate_workers: int = 1,
+         counts_only: bool = False, cascade: bool = False, checkpoint: str = None, resume: bool = False,
+         stats: str = None, data: str = None, eval_workers: int = 1):
     """Combines the rater and evaluator classes and is the main entry point if you want to assess comment quality.
-    Creates a json file with the data at the output location.
+    The rated comments are passed to the filter and evaluator in memory. Creates a json file with the data at the
+    output location.
 
     Args:
         project: Path to directory of project to analyze.
         output: Path to output file.
         models: Path to directory holding the comment classification models.
-        syn: Argument for enabling the synonym analysis (0 or 1). Not recommended for large projects.
+        syn: Argument for enabling the synonym analysis (0 or 1).
         language: Code language of files to be evaluated.
         label: Label (summary, usage, rationale, expand, warning) of comments to be evaluated.
+        workers: Number of worker processes running srcML.
+        timeout: Seconds srcML may spend on a single file when running with several workers.
+        cache: Path to the cache directory of scraped and rated files, None to disable the cache.
+        cache_size: Maximum size of the cache in megabytes.
+        backend: Backend for extracting the comments, 'srcml' or the built-in 'lexer'.
+        archive: Path to a directory for keeping the compressed srcML output for reuse, None to disable.
+        extensions: File extensions to scrape, all other files are skipped.
+        max_size: Maximum size of a file to scrape in kilobytes, None for no limit.
+        gitignore: Whether files ignored by the .gitignore files of the project are skipped.
+        ignore_file: Name of the ignore file in the project root with additional rules, None to disable.
+        batch_size: Number of comments rated together.
+        rate_workers: Number of worker processes rating the comments, sharing the loaded models through fork.
+        counts_only: Only keep the counts of complex words, syllables and sentences, not their lists, sentences
+            are counted with a regex instead of NLTK.
+        cascade: Skip the classification, readability metrics and synonyms of comments the evaluator ignores, they
+            get no label and are dropped when filtering by label.
+        checkpoint: Path to a file checkpointing the rated comments of every file, None to disable.
+        resume: Continue the run of the checkpoint, skipping the files it completed.
+        stats: Path to a .json file for the durations of the stages, None to disable.
+        data: Path to a .csv or .parquet file for keeping the data of the rated comments, with the missing and filtered
+            comments in _missing and _filtered files next to it, None to not write them.
+        eval_workers: Number of worker processes matching the synonyms of the files and evaluating the subtrees.
     """
     logging.info("Entering main() function with arguments: project: %s, output: %s, models: %s, syn: %d", project, output, models, syn)
     # check if 'project' is a valid directory
@@ -63,30 +100,102 @@ def main(project: str, output: str, models: str, syn: int, language: str, label:
     logging.debug("Models is a valid directory")
 
     # rate, filter, and evaluate project
-    comments_data = os.path.join(TMP_PATH, "rater_data.csv")
-    missing_comments_data = os.path.join(TMP_PATH, "rater_data_missing.csv")
-    filtered_comments_data = os.path.join(TMP_PATH, "rater_data_filtered.csv")
+    # durations of the stages of all three steps
+    timer = StageTimer()
+    start = time.perf_counter()
 
-    logging.debug("Calling rate()")
-    rate(project, comments_data, models)
-    logging.debug("Done with rate()")
+    logging.debug("Calling rate_project()")
+    all_comments = rate_project(project, models, workers, timeout, cache, cache_size, backend, archive, extensions,
+                                max_size, gitignore, ignore_file, batch_size, rate_workers, counts_only, cascade,
+                                checkpoint, resume, timer)
+    logging.debug("Done with rate_project()")
+
+    # tables of the found and missing comments, without the token lists the evaluator does not use
+    with timer.stage("table", len(all_comments["comments"])):
+        e = CommentExporter(data is None)
+        comments = e.get_comments_frame(all_comments["comments"])
+        missing_comments = e.get_missing_comments_frame(all_comments["missing_comments"])
+    if data:
+        # keep the intermediate data on request
+        e.export_comments(all_comments["comments"], data)
+        e.export_missing_comments(all_comments["missing_comments"], get_missing_path(data))
 
     logging.debug("Calling filter()")
-    filter(comments_data, language, label)
+    with timer.stage("filter"):
+        comment_filter = CommentFilter(comments)
+        comment_filter.filter(language, label)
     logging.debug("Done with filter()")
+    if data:
+        write_data(comment_filter.data_frame, get_suffixed_path(data, "_filtered"))
 
     logging.debug("Calling evaluate()")
-    evaluate(project, output, filtered_comments_data, missing_comments_data, syn)
+    with timer.stage("evaluate"):
+        CommentEvaluator(project, comment_filter.data_frame, missing_comments).evaluate(output, syn, eval_workers)
     logging.debug("Done with evaluate()")
-    
-    # delete temporary files
-    os.remove(comments_data)
-    os.remove(missing_comments_data)
-    os.remove(filtered_comments_data)
+    timer.add("total", time.perf_counter() - start, timer.items.get("scrape", 0))
+    if stats:
+        timer.write(stats)
 
     logging.info("Done. View output file at %s", output)
 
 
+def diff(project: str, output: str, models: str, syn: int, language: str, label: str, base: str, head: str,
+         **kwargs):
+    """Analyzes only the files touched between two revisions of a git repository and creates a json file at the output
+    location with the change of every touched file's metrics.
+
+    Args:
+        project: Path to the git repository to analyze.
+        output: Path to output file.
+        models: Path to directory holding the comment classification models.
+        syn: Argument for enabling the synonym analysis (0 or 1).
+        language: Code language of files to be evaluated.
+        label: Label (summary, usage, rationale, expand, warning) of comments to be evaluated.
+        base: Base revision (e.g. a branch, tag or commit hash).
+        head: Head revision.
+        kwargs: Further options of main() used for both revisions, e.g. workers, cache or backend. The files of the
+            data, stats and checkpoint options get a _base or _head suffix, so the revisions do not overwrite them.
+    """
+    logging.info("Entering diff() function with arguments: project: %s, base: %s, head: %s", project, base, head)
+    files = get_changed_files(project, base, head)
+    logging.info("%d files touched between %s and %s", len(files), base, head)
+    metrics = []
+    for rev, suffix in ((base, "_base"), (head, "_head")):
+        options = dict(kwargs)
+        for key in ("data", "stats", "checkpoint"):
+            if options.get(key):
+                options[key] = get_suffixed_path(options[key], suffix)
+        with tempfile.TemporaryDirectory() as tmp:
+            # analyze the touched files as they are at the revision
+            src = os.path.join(tmp, "src").replace("\\", "/")
+            os.makedirs(src)
+            export_revision(project, rev, files, src)
+            result_path = os.path.join(tmp, "result.json")
+            main(src, result_path, models, syn, language, label, **options)
+            with open(result_path) as f:
+                metrics.append(get_file_metrics(simplejson.load(f)))
+    report = get_delta_report(base, head, files, metrics[0], metrics[1])
+    with open(output, 'w') as f:
+        simplejson.dump(report, f, ignore_nan=True)
+    logging.info("Done. View delta report at %s", output)
+
+
+def get_suffixed_path(path: str, suffix: str) -> str:
+    """
+    Helper to add a suffix to the name of a file, keeping its extension.
+
+    Args:
+        path: Path to the file.
+        suffix: Suffix for the file name, e.g. '_base'.
+
+    Returns:
+        The suffixed path.
+    """
+    res_path, res_filename = os.path.split(path)
+    res_filename, res_extension = os.path.splitext(res_filename)
+    return os.path.join(res_path, res_filename + suffix + res_extension)
+
+
 if __name__ == '__main__':
     # mandatory arguments
     parser = argparse.ArgumentParser(
@@ -100,10 +209,11 @@ if __name__ == '__main__':
     parser.add_argument('models', metavar='Models', type=str,
                         help='Path to the directory of the trained models for comment type classification.')
     # optional arguments
-    parser.add_argument("-syn", "--synonyms", type=int, help="Enable synonym analysis of comments in files. Not "
-                                                             "recommended for big projects due to complexity. [0 ("
+    parser.add_argument("-syn", "--synonyms", type=int, help="Enable synonym analysis of comments in files. [0 ("
                                                              "default), 1].",
                         choices=[0, 1], default=0)
+    parser.add_argument("-eval_workers", "--eval_workers", type=int, default=1,
+                        help="Number of processes matching the synonyms and evaluating the subtrees. Example --eval_workers 8, default=1")
     labels = {
         'summary': "__label__summary",
         'expand': "__label__expand",
@@ -121,6 +231,47 @@ if __name__ == '__main__':
         'any': ""
     }
     parser.add_argument("-lang", "--language", default="any", help=("Filter by code language. Example --language c++, default='any'"), choices=languages.keys())
+    parser.add_argument("-workers", "--workers", type=int, default=1,
+                        help="Number of processes running srcML file by file. Example --workers 8, default=1")
+    parser.add_argument("-timeout", "--timeout", type=float, default=None,
+                        help="Seconds srcML may spend on a single file when using several workers. Example --timeout 60")
+    parser.add_argument("-cache", "--cache", type=str, default=None,
+                        help="Path to a directory for caching the results of unchanged files between runs.")
+    parser.add_argument("-cache_size", "--cache_size", type=int, default=1024,
+                        help="Maximum size of the cache in megabytes. Example --cache_size 512, default=1024")
+    parser.add_argument("-backend", "--backend", default="srcml", choices=BACKENDS,
+                        help="Extract comments with srcML or the faster built-in lexer. Example --backend lexer, default='srcml'")
+    parser.add_argument("-archive", "--archive", type=str, default=None,
+                        help="Path to a directory for keeping the compressed srcML output and reusing it while the files are unchanged. Only used with one worker, the srcml backend and no cache or checkpoint.")
+    parser.add_argument("-extensions", "--extensions", type=str, nargs="+", default=list(SOURCE_EXTENSIONS),
+                        help="File extensions to scrape. Example --extensions .java .cs, default=all supported")
+    parser.add_argument("-max_size", "--max_size", type=int, default=None,
+                        help="Skip files larger than this size in kilobytes, e.g. generated code. Example --max_size 512")
+    parser.add_argument("-gitignore", "--gitignore", type=int, default=1, choices=[0, 1],
+                        help="Skip the files ignored by the .gitignore files of the project. Example --gitignore 0, default=1")
+    parser.add_argument("-ignore_file", "--ignore_file", type=str, default=IGNORE_FILE,
+                        help="Name of an ignore file in the project root with .gitignore syntax. default='%s'" % IGNORE_FILE)
+    parser.add_argument("-batch_size", "--batch_size", type=int, default=BATCH_SIZE,
+                        help="Number of comments rated together. Example --batch_size 1024, default=%d" % BATCH_SIZE)
+    parser.add_argument("-rate_workers", "--rate_workers", type=int, default=1,
+                        help="Number of processes rating the comments, needs fork. Example --rate_workers 8, default=1")
+    parser.add_argument("-counts_only", "--counts_only", type=int, default=0, choices=[0, 1],
+                        help="Only keep the counts of complex words, syllables and sentences, not their lists. "
+                             "Sentences are counted with a regex, which can differ from NLTK. default=0")
+    parser.add_argument("-cascade", "--cascade", type=int, default=0, choices=[0, 1],
+                        help="Skip the classification, readability and synonyms of comments the evaluator ignores (headers, commented code, non-english, too short). default=0")
+    parser.add_argument("-checkpoint", "--checkpoint", type=str, default=None,
+                        help="Path for a file checkpointing the rated comments file by file. Example --checkpoint run.checkpoint")
+    parser.add_argument("-resume", "--resume", type=int, default=0, choices=[0, 1],
+                        help="Continue the run of the checkpoint, skipping the files it completed. default=0")
+    parser.add_argument("-stats", "--stats", type=str, default=None,
+                        help="Path for a .json file with the durations and throughput of every stage. Example --stats stats.json")
+    parser.add_argument("-data", "--data", type=str, default=None,
+                        help="Path for keeping the data of the rated comments as .csv or .parquet. Example --data rater_data.parquet")
+    parser.add_argument("-base", "--base", type=str, default=None,
+                        help="Only analyze files touched since this git revision and report the change of their metrics.")
+    parser.add_argument("-head", "--head", type=str, default="HEAD",
+                        help="Git revision to compare against --base. Example --head feature, default='HEAD'")
     levels = {
         'critical': logging.CRITICAL,
         'error': logging.ERROR,
@@ -138,7 +289,21 @@ if __name__ == '__main__':
     level = levels.get(args.log.lower())
     logging.basicConfig(format='%(asctime)s -%(levelname)s- [%(filename)s:%(lineno)d] \n \t %(message)s',
                         level=level, stream=sys.stdout)
-    # call main()
-    main(args.project.replace("\\", "/"), args.output, args.models, args.synonyms, languages[args.language], labels[args.label])
+    if args.base:
+        # analyze the touched files only
+        diff(args.project.replace("\\", "/"), args.output, args.models, args.synonyms, languages[args.language],
+             labels[args.label], args.base, args.head, workers=args.workers, timeout=args.timeout, cache=args.cache,
+             cache_size=args.cache_size, backend=args.backend, archive=args.archive,
+             extensions=tuple(args.extensions), max_size=args.max_size, gitignore=bool(args.gitignore),
+             ignore_file=args.ignore_file, batch_size=args.batch_size, rate_workers=args.rate_workers,
+             counts_only=bool(args.counts_only), cascade=bool(args.cascade), checkpoint=args.checkpoint,
+             resume=bool(args.resume), stats=args.stats, data=args.data, eval_workers=args.eval_workers)
+    else:
+        # call main()
+        main(args.project.replace("\\", "/"), args.output, args.models, args.synonyms, languages[args.language], labels[args.label],
+             args.workers, args.timeout, args.cache, args.cache_size, args.backend, args.archive,
+             tuple(args.extensions), args.max_size, bool(args.gitignore), args.ignore_file, args.batch_size,
+             args.rate_workers, bool(args.counts_only), bool(args.cascade), args.checkpoint, bool(args.resume),
+             args.stats, args.data, args.eval_workers)
 
     exit()
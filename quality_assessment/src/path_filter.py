@@ -0,0 +1,225 @@
+"""
+Copyright (c) 2021 Tim Moser.
+
+This file is part of coality
+(see https://github.com/TimDeanMoser/coality).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import re
+
+SOURCE_EXTENSIONS = ('.java', '.cpp', '.c', '.cc', '.cxx', '.cs', '.h', '.hh', '.hpp', '.hxx')
+"""Default file extensions handed to the scraper"""
+
+IGNORE_FILE = ".coalityignore"
+"""Name of the project-level ignore file, it uses the .gitignore syntax"""
+
+
+class PathFilter:
+    """
+    Class for listing the files of a project that should be scraped. Ignored directories are pruned before they are
+    walked, so their files are never looked at.
+
+    Args:
+        extensions: Tuple of allowed file extensions.
+        max_size: Maximum file size in bytes, None for no limit.
+        gitignore: Whether the .gitignore files of the project are respected.
+        ignore_file: Name of the project-level ignore file in the project root, None to disable.
+
+    Attributes:
+        skipped_files: Number of files skipped by the last listing.
+        skipped_bytes: Size of the files skipped by the last listing.
+        skipped_dirs: Number of directories pruned by the last listing.
+    """
+
+    def __init__(self, extensions: tuple = SOURCE_EXTENSIONS, max_size: int = None, gitignore: bool = True,
+                 ignore_file: str = IGNORE_FILE):
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.max_size = max_size
+        self.gitignore = gitignore
+        self.ignore_file = ignore_file
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self.skipped_dirs = 0
+
+    def list_files(self, dir: str) -> list:
+        """
+        Lists all files under a directory that pass the ignore rules, extension allowlist and size limit, in a stable
+        order. The paths are relative to dir and prefixed with './', the same way srcML names the files when called
+        on '.'.
+
+        Args:
+            dir: path to parent directory.
+
+        Returns:
+            Sorted list of file paths.
+        """
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self.skipped_dirs = 0
+        # rules of the project-level ignore file apply last, so they override the .gitignore files
+        project_rules = read_rules(os.path.join(dir, self.ignore_file), "") if self.ignore_file else []
+        # rules of the .gitignore files of every directory walked, inherited by its subdirectories
+        inherited = {".": []}
+        files = []
+        for root, dirs, filenames in os.walk(dir):
+            rel = os.path.relpath(root, dir).replace("\\", "/")
+            rules = inherited.pop(rel)
+            if self.gitignore:
+                rules = rules + read_rules(os.path.join(root, ".gitignore"), "" if rel == "." else rel + "/")
+            prefix = "" if rel == "." else rel + "/"
+            kept = []
+            for d in sorted(dirs):
+                if d == ".git" or is_ignored(prefix + d, True, rules + project_rules):
+                    self.skipped_dirs += 1
+                    continue
+                kept.append(d)
+                inherited[prefix + d] = rules
+            # prune ignored directories in place, os.walk does not descend into them
+            dirs[:] = kept
+            for filename in filenames:
+                path = prefix + filename
+                if not filename.lower().endswith(self.extensions) or is_ignored(path, False, rules + project_rules):
+                    self.skip(os.path.join(root, filename))
+                    continue
+                if self.max_size is not None and os.path.getsize(os.path.join(root, filename)) > self.max_size:
+                    self.skip(os.path.join(root, filename))
+                    continue
+                files.append("./" + path)
+        return sorted(files)
+
+    def skip(self, path: str):
+        """
+        Helper to count a skipped file.
+
+        Args:
+            path: Path to the file.
+        """
+        self.skipped_files += 1
+        try:
+            self.skipped_bytes += os.path.getsize(path)
+        except OSError:
+            # broken links
+            pass
+
+
+def read_rules(path: str, base: str) -> list:
+    """
+    Read the rules of an ignore file in the .gitignore syntax.
+
+    Args:
+        path: Path to the ignore file, a missing file has no rules.
+        base: Path of the directory holding the ignore file relative to the project, '' for the root or ending in '/'.
+
+    Returns:
+        List of tuples (compiled pattern, negated, only matches directories).
+    """
+    rules = []
+    try:
+        with open(path, encoding="UTF-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        # trailing spaces are ignored unless escaped
+        line = re.sub(r"(?<!\\)\s+$", "", line)
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        if line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        rules.append((re.compile(translate(line, base)), negated, dir_only))
+    return rules
+
+
+def translate(pattern: str, base: str) -> str:
+    """
+    Translate a .gitignore pattern into a regular expression matching paths relative to the project.
+
+    Args:
+        pattern: Pattern without negation and trailing slash.
+        base: Path of the directory holding the ignore file relative to the project, '' for the root or ending in '/'.
+
+    Returns:
+        Regular expression.
+    """
+    # a pattern with a slash is relative to the ignore file, otherwise it matches at any depth below it
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    res = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            res += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            res += "/.*"
+            i += 3
+        elif pattern.startswith("**", i):
+            res += ".*"
+            i += 2
+        elif c == "*":
+            res += "[^/]*"
+            i += 1
+        elif c == "?":
+            res += "[^/]"
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                res += re.escape(c)
+                i += 1
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                res += "[" + body + "]"
+                i = end + 1
+        elif c == "\\" and i + 1 < len(pattern):
+            res += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            res += re.escape(c)
+            i += 1
+    return re.escape(base) + ("" if anchored else "(?:.*/)?") + res + r"\Z"
+
+
+def is_ignored(path: str, is_dir: bool, rules: list) -> bool:
+    """
+    Helper to check a path against ignore rules, the last matching rule decides.
+
+    Args:
+        path: Path relative to the project.
+        is_dir: Whether the path is a directory.
+        rules: List of rules, see read_rules.
+
+    Returns:
+        True if the path is ignored, False otherwise.
+    """
+    ignored = False
+    for pattern, negated, dir_only in rules:
+        if dir_only and not is_dir:
+            continue
+        if pattern.match(path):
+            ignored = not negated
+    return ignored
@@ -0,0 +1,184 @@
+"""
+Copyright (c) 2021 Tim Moser.
+
+This file is part of coality
+(see https://github.com/TimDeanMoser/coality).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import math
+import time
+from contextlib import contextmanager
+
+PERCENTILES = [50, 90, 99]
+"""Percentiles of the durations reported for every stage"""
+
+BUCKET_RATIO = 2 ** (1 / 32)
+"""Ratio of the bounds of neighbouring histogram buckets, the relative error of the percentiles"""
+
+MIN_SECONDS = 1e-7
+"""Upper bound of the first histogram bucket, shorter durations are counted in it"""
+
+
+class StageTimer:
+    """
+    Collects high resolution durations of the stages of the pipeline, e.g. scraping, classification or evaluation.
+    Every duration is a sample of a stage together with the number of items (comments, files) it processed.
+    The durations are not kept, only their count, total, maximum and a log-scale histogram for the percentiles, so
+    the memory of a timer does not grow with the number of samples.
+
+    Attributes:
+        samples: Dict of stage names and their number of durations.
+        totals: Dict of stage names and the sum of their durations in seconds.
+        maxima: Dict of stage names and their longest duration in seconds.
+        histograms: Dict of stage names and dicts of histogram bucket indices and their number of durations.
+        items: Dict of stage names and the number of items they processed.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.totals = {}
+        self.maxima = {}
+        self.histograms = {}
+        self.items = {}
+
+    def add(self, stage: str, seconds: float, items: int = 1):
+        """
+        Add a duration of a stage.
+
+        Args:
+            stage: Name of the stage.
+            seconds: Duration in seconds.
+            items: Number of items processed in that time.
+        """
+        self.samples[stage] = self.samples.get(stage, 0) + 1
+        self.totals[stage] = self.totals.get(stage, 0) + seconds
+        self.maxima[stage] = max(self.maxima.get(stage, seconds), seconds)
+        histogram = self.histograms.setdefault(stage, {})
+        bucket = get_bucket(seconds)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+        self.items[stage] = self.items.get(stage, 0) + items
+
+    @contextmanager
+    def stage(self, stage: str, items: int = 1):
+        """
+        Context manager timing its body as a sample of a stage.
+
+        Args:
+            stage: Name of the stage.
+            items: Number of items processed in the body.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, items)
+
+    def merge(self, other):
+        """
+        Add all durations of another timer, e.g. of a worker process.
+
+        Args:
+            other: StageTimer to merge.
+        """
+        for stage, samples in other.samples.items():
+            self.samples[stage] = self.samples.get(stage, 0) + samples
+            self.totals[stage] = self.totals.get(stage, 0) + other.totals[stage]
+            self.maxima[stage] = max(self.maxima.get(stage, other.maxima[stage]), other.maxima[stage])
+            histogram = self.histograms.setdefault(stage, {})
+            for bucket, count in other.histograms[stage].items():
+                histogram[bucket] = histogram.get(bucket, 0) + count
+            self.items[stage] = self.items.get(stage, 0) + other.items[stage]
+
+    def reset(self):
+        """
+        Remove all durations.
+        """
+        self.samples = {}
+        self.totals = {}
+        self.maxima = {}
+        self.histograms = {}
+        self.items = {}
+
+    def get_stats(self) -> dict:
+        """
+        Summarize the durations of every stage.
+
+        Returns:
+            Dict of stage names and dicts with the number of samples and items, the total and mean seconds,
+            the percentiles and maximum of the durations in milliseconds and the items per second.
+        """
+        stats = {}
+        for stage, samples in self.samples.items():
+            total = self.totals[stage]
+            stats[stage] = {
+                "samples": samples,
+                "items": self.items[stage],
+                "total_seconds": total,
+                "mean_millis": total / samples * 1000,
+            }
+            for p in PERCENTILES:
+                stats[stage]["p%d_millis" % p] = min(get_percentile(self.histograms[stage], samples, p),
+                                                     self.maxima[stage]) * 1000
+            stats[stage]["max_millis"] = self.maxima[stage] * 1000
+            stats[stage]["items_per_second"] = self.items[stage] / total if total > 0 else None
+        return stats
+
+    def write(self, path: str):
+        """
+        Write the summary of all stages to a .json file.
+
+        Args:
+            path: Path to the output file.
+        """
+        with open(path, "w") as f:
+            json.dump({"stages": self.get_stats()}, f, indent=2)
+
+
+def get_bucket(seconds: float) -> int:
+    """
+    Helper to get the histogram bucket of a duration, bucket i holds durations up to MIN_SECONDS * BUCKET_RATIO ** i.
+
+    Args:
+        seconds: Duration in seconds.
+
+    Returns:
+        Index of the bucket.
+    """
+    if seconds <= MIN_SECONDS:
+        return 0
+    return math.ceil(math.log(seconds / MIN_SECONDS, BUCKET_RATIO))
+
+
+def get_percentile(histogram: dict, samples: int, p: float) -> float:
+    """
+    Helper to get a percentile of the durations in a histogram with the nearest rank method.
+
+    Args:
+        histogram: Dict of bucket indices and their number of durations, not empty.
+        samples: Number of durations in the histogram.
+        p: Percentile between 0 and 100.
+
+    Returns:
+        Upper bound of the bucket holding the duration at the percentile, in seconds.
+    """
+    rank = max(1, -(-samples * p // 100))
+    count = 0
+    for bucket in sorted(histogram):
+        count += histogram[bucket]
+        if count >= rank:
+            return MIN_SECONDS * BUCKET_RATIO ** bucket
+    return MIN_SECONDS * BUCKET_RATIO ** max(histogram)
@@ -0,0 +1,208 @@
+"""
+Copyright (c) 2021 Tim Moser.
+
+This file is part of coality
+(see https://github.com/TimDeanMoser/coality).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Build the precomputed synonym lexicon from WordNet. The lexicon holds the synonyms of every word form WordNet knows,
+so the rater looks them up in the file instead of traversing the NLTK corpus.
+For a smooth performance, make sure that the root of the repository is the working directory when running the script and use absolute paths as the arguments.
+
+Example:
+    $ python synonym_lexicon.py
+    $ python synonym_lexicon.py C:\\my_lexicon.txt
+"""
+
+import argparse
+import functools
+import logging
+import mmap
+import os
+import re
+import sys
+
+LEXICON_PATH = r'quality_assessment/data/synonyms.txt'
+"""Default path of the precomputed synonym lexicon"""
+
+CACHE_SIZE = 65536
+"""Maximum number of words whose synonyms are memoized"""
+
+WORD = re.compile(r"[a-z][-'a-z]*\Z")
+"""Pattern of the words the tokenizer produces, only those are looked up"""
+
+
+class SynonymLexicon:
+    """
+    Memoized synonym lookup. Reads the precomputed lexicon file through a memory map if it exists and falls back to
+    WordNet otherwise, both give the same synonyms.
+
+    Args:
+        path: Path to the lexicon file, None to always use WordNet.
+        cache_size: Maximum number of words whose synonyms are memoized.
+
+    Attributes:
+        lexicon: Memory map of the lexicon file, None if WordNet is used.
+    """
+
+    def __init__(self, path: str = LEXICON_PATH, cache_size: int = CACHE_SIZE):
+        self.lexicon = None
+        if path and os.path.isfile(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                self.lexicon = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            logging.debug("No synonym lexicon at %s, looking up synonyms in WordNet.", path)
+        self.lookup = functools.lru_cache(maxsize=cache_size)(self.find if self.lexicon else get_wordnet_synonyms)
+
+    def get_synonyms(self, words: list) -> dict:
+        """
+        Creates a list of synonyms for each word in a list of words.
+
+        Args:
+            words: List of words to evaluate.
+
+        Returns:
+            Dict with words as keys and synonyms list as value.
+        """
+        # copy the memoized lists, so the comments do not share them
+        return {word: list(self.lookup(word)) for word in words}
+
+    def find(self, word: str) -> tuple:
+        """
+        Binary search for a word in the sorted lines of the lexicon.
+
+        Args:
+            word: Word to look up.
+
+        Returns:
+            Tuple of synonyms, empty if the word is not in the lexicon.
+        """
+        key = word.encode()
+        lexicon = self.lexicon
+        lo, hi = 0, len(lexicon)
+        # lo and hi always point to the start of a line
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = lexicon.rfind(b"\n", 0, mid) + 1
+            end = lexicon.find(b"\n", start)
+            tab = lexicon.find(b"\t", start, end)
+            entry = lexicon[start:tab]
+            if entry < key:
+                lo = end + 1
+            elif entry > key:
+                hi = start
+            else:
+                return tuple(lexicon[tab + 1:end].decode().split())
+        return ()
+
+
+def get_wordnet_synonyms(word: str) -> tuple:
+    """
+    Get the synonyms of a word from WordNet, leaving out multi-word lemmas and lemmas with the same stem.
+
+    Args:
+        word: Word to look up.
+
+    Returns:
+        Tuple of synonyms.
+    """
+    from nltk.corpus import wordnet as wn
+    from stemming.porter2 import stem
+    tmp = []
+    word_stem = stem(word)
+    for synset in wn.synsets(word):
+        for w in synset.lemma_names():
+            if "_" not in w and word != w and w not in tmp and stem(w) != word_stem:
+                tmp.append(w)
+    return tuple(tmp)
+
+
+def get_word_forms(wn) -> set:
+    """
+    Helper to list every word form WordNet finds synsets for: the lemmas, the irregular forms of the exception lists
+    and the forms its morphological rules reduce to a lemma.
+
+    Args:
+        wn: WordNet corpus reader.
+
+    Returns:
+        Set of word forms.
+    """
+    forms = set()
+    for pos, substitutions in wn.MORPHOLOGICAL_SUBSTITUTIONS.items():
+        lemmas = list(wn.all_lemma_names(pos))
+        forms.update(lemmas)
+        forms.update(wn._exception_map.get(pos, {}))
+        # reverse the rules, a form ending in 'old' is reduced to the lemma ending in 'new'
+        for old, new in substitutions:
+            forms.update(lemma[:len(lemma) - len(new)] + old for lemma in lemmas if lemma.endswith(new))
+    return forms
+
+
+def build(path: str) -> int:
+    """
+    Build the synonym lexicon file from WordNet. Every line holds a word and its synonyms, sorted by word.
+
+    Args:
+        path: Path to the lexicon file to write.
+
+    Returns:
+        Number of words in the lexicon.
+    """
+    from nltk.corpus import wordnet as wn
+    lines = []
+    for word in get_word_forms(wn):
+        if not WORD.match(word):
+            continue
+        synonyms = get_wordnet_synonyms(word)
+        if synonyms:
+            lines.append((word + "\t" + " ".join(synonyms) + "\n").encode())
+    # sorted by the bytes of the word, the order the binary search compares in
+    lines.sort(key=lambda line: line[:line.index(b"\t")])
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.writelines(lines)
+    os.replace(tmp, path)
+    return len(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the precomputed synonym lexicon from WordNet.')
+    parser.add_argument('output', metavar='Output', type=str, nargs="?", default=LEXICON_PATH,
+                        help='Path for the lexicon file, default=%s' % LEXICON_PATH)
+    levels = {
+        'critical': logging.CRITICAL,
+        'error': logging.ERROR,
+        'warn': logging.WARNING,
+        'warning': logging.WARNING,
+        'info': logging.INFO,
+        'debug': logging.DEBUG
+    }
+    parser.add_argument("-log", "--log", default="info",
+                        help=("Provide logging level. Example --log debug', default='info'"), choices=levels.keys())
+
+    args = parser.parse_args()
+    # get and set logger level and format
+    level = levels.get(args.log.lower())
+    logging.basicConfig(format='%(asctime)s -%(levelname)s- [%(filename)s:%(lineno)d] \n \t %(message)s',
+                        level=level, stream=sys.stdout)
+    # import and update/download the wordnet data
+    import nltk
+    nltk.download('wordnet')
+    logging.info("Wrote %d words to %s", build(args.output), args.output)
+
+    exit()
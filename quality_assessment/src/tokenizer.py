@@ -20,8 +20,6 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import re
 
-import nltk
-
 WORD_PAT = r"([a-z][-'a-z]*)"
 """Pattern for matching words."""
 VOWELS = r"[aeiouy]"
@@ -30,24 +28,49 @@ VALID_HYPHENS = r"[a-z]{2,}-[a-z]{2,}"
 """Pattern for matching words with valid hyphens"""
 SYLLABLES = r"[bcdfghjklmnpqrstvwxz]*[aeiouy]+[bcdfghjklmnpqrstvwxz]*"
 """Pattern for matching syllables of a word"""
+SENTENCE_END = r"(?:(?<!\b[a-zA-Z])(?<!\.)\.(?!\.)|[.?!]*[?!][.?!]*)(?=\s+\S|[:@])"
+"""Pattern for matching sentence boundaries like NLTK's punkt, a single period after an initial or an ellipsis is none"""
+ABBREVIATIONS = r"(?<![\w.])(?:approx|cf|corp|dr|etc|fig|inc|jr|ltd|mr|mrs|ms|prof|sr|vs)\.(?=\s+\S|[:@])"
+"""Pattern for matching abbreviations whose period SENTENCE_END counts as a sentence boundary"""
+
+WORD_RE = re.compile(WORD_PAT)
+VOWELS_RE = re.compile(VOWELS)
+VALID_HYPHENS_RE = re.compile(VALID_HYPHENS)
+SYLLABLES_RE = re.compile(SYLLABLES)
+SENTENCE_END_RE = re.compile(SENTENCE_END)
+ABBREVIATIONS_RE = re.compile(ABBREVIATIONS, re.IGNORECASE)
 
 
 class Tokenizer:
     """
-    Class for basic NLP on comment objects
+    Class for basic NLP on comment objects, one instance can be reused for any number of comments.
+
+    Args:
+        counts_only: Only count the complex words, sentences and syllables instead of keeping their lists. Sentences
+            are counted with SENTENCE_END_RE instead of NLTK's punkt, which needs no NLTK data but can differ from
+            the number of sentences NLTK finds, e.g. after abbreviations not in ABBREVIATIONS.
 
     Attributes:
         words: List of words in comment
-        complex_words: List of words with >=3 syllables in comment
-        sentences: List of sentences in comment
-        syllables: Concatenated list of all syllables in a comment
+        complex_words: List of words with >=3 syllables in comment, None when counting only
+        sentences: List of sentences in comment, None when counting only
+        syllables: Concatenated list of all syllables in a comment, None when counting only
+        n_words: Number of words in comment
+        n_complex_words: Number of words with >=3 syllables in comment
+        n_sentences: Number of sentences in comment
+        n_syllables: Number of syllables in comment
     """
-    def __init__(self):
+    def __init__(self, counts_only: bool = False):
         # nltk.download('punkt')
+        self.counts_only = counts_only
         self.words: list = []
         self.complex_words: list = []
         self.sentences: list = []
         self.syllables: list = []
+        self.n_words = 0
+        self.n_complex_words = 0
+        self.n_sentences = 0
+        self.n_syllables = 0
 
     def get_stats(self, comment):
         """
@@ -57,28 +80,54 @@ class Tokenizer:
             comment: Comment object to evaluate
 
         Returns:
-            Writes words, complex_words, sentences and syllables into comment object
+            Writes words, complex_words, sentences and syllables and their counts into comment object
         """
         line = comment.processed_text
-        # match words
-        raw_words = re.findall(WORD_PAT, line.lower().strip())
-        # filter words without vowels or with invalid hyphens
-        self.words = list(filter(lambda word: not (
-                not re.search(VOWELS, word) or (word.find("-") > 0 and not re.search(VALID_HYPHENS, word))), raw_words))
-        # get sentences
-        self.sentences = nltk.sent_tokenize(line)
+        # match words, filter words without vowels or with invalid hyphens
+        self.words = [word for word in WORD_RE.findall(line.lower().strip()) if VOWELS_RE.search(word) and not (
+                word.find("-") > 0 and not VALID_HYPHENS_RE.search(word))]
+        if self.counts_only:
+            # count sentence boundaries except after abbreviations, a non-empty text without one is a single sentence
+            stripped = line.strip()
+            sentences = None
+            n_sentences = 0
+            if stripped:
+                n_sentences = len(SENTENCE_END_RE.findall(stripped)) - len(ABBREVIATIONS_RE.findall(stripped)) + 1
+        else:
+            # get sentences, NLTK takes seconds to import and is only imported when needed
+            import nltk
+            sentences = nltk.sent_tokenize(line)
+            n_sentences = len(sentences)
+        syllables = None if self.counts_only else []
+        complex_words = None if self.counts_only else []
+        n_syllables = 0
+        n_complex_words = 0
         for word in self.words:
-            syl = re.findall(SYLLABLES, word.lower())
+            syl = SYLLABLES_RE.findall(word)
             # tailing 'e' can cause an edge case with the regex, which is why it is added to the second to last syllable
             if len(syl) > 1 and syl[-1] == "e":
-                tmp = syl[0:-2]
-                tmp.append(syl[-2] + 'e')
-                syl = tmp
-            self.syllables = self.syllables + syl
+                syl[-2] += 'e'
+                del syl[-1]
+            n_syllables += len(syl)
+            if syllables is not None:
+                syllables.extend(syl)
             # add complex word list if >= 3 syllables
             if len(syl) >= 3:
-                self.complex_words.append(word)
+                n_complex_words += 1
+                if complex_words is not None:
+                    complex_words.append(word)
+        self.sentences = sentences
+        self.syllables = syllables
+        self.complex_words = complex_words
+        self.n_words = len(self.words)
+        self.n_complex_words = n_complex_words
+        self.n_sentences = n_sentences
+        self.n_syllables = n_syllables
         comment.words = self.words
         comment.complex_words = self.complex_words
         comment.sentences = self.sentences
-        comment.syllables = self.syllables
\ No newline at end of file
+        comment.syllables = self.syllables
+        comment.n_words = self.n_words
+        comment.n_complex_words = self.n_complex_words
+        comment.n_sentences = self.n_sentences
+        comment.n_syllables = self.n_syllables
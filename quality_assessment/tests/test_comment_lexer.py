@@ -0,0 +1,105 @@
+"""
+Copyright (c) 2021 Tim Moser.
+
+This file is part of coality
+(see https://github.com/TimDeanMoser/coality).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Tests of the lexer backend. Run from the root of the repository.
+
+Example:
+    $ python -m pytest quality_assessment/tests
+"""
+
+import unittest
+
+from quality_assessment.src.comment_lexer import Lexer
+from quality_assessment.src.comment_scraper import CommentScraper
+
+HEADER_INCLUDE = ("/* License */\n"
+                  "#include <vector>\n"
+                  "#ifdef DEBUG\n"
+                  "#define LOG 1\n"
+                  "#endif\n"
+                  "class Parser {\n"
+                  "    void parse() {}\n"
+                  "    void close() {}\n"
+                  "};\n")
+"""Header comment, then preprocessor lines, then a class"""
+
+
+class TestHeaderBeforeDirective(unittest.TestCase):
+    """A header comment followed by preprocessor lines does not belong to the class after them."""
+
+    def setUp(self):
+        lexer = Lexer(HEADER_INCLUDE)
+        self.comments = lexer.get_comments()
+        self.missing = lexer.get_missing_comments()
+
+    def test_header_has_no_element(self):
+        self.assertEqual(self.comments, [("1:1", "/* License */", None, None)])
+
+    def test_header_type(self):
+        found = []
+        missing = []
+        CommentScraper().scrape_lexed("./Parser.cpp", "C++", self.comments, self.missing, found, missing)
+        self.assertEqual([(c.type, c.handle) for c in found], [("header", None)])
+
+    def test_class_missing_once(self):
+        self.assertEqual([m for m in self.missing if m[2] == "class"], [("6:1", "Parser", "class")])
+
+    def test_comment_after_directive(self):
+        comments = Lexer("#include <vector>\n// Parses input.\nclass Parser {\n};\n").get_comments()
+        self.assertEqual(comments, [("2:1", "// Parses input.", "class", "Parser")])
+
+
+class TestGenericReturnType(unittest.TestCase):
+    """Commas and wildcards in the generic arguments of a return type do not hide the declaration."""
+
+    def test_java_function(self):
+        comments = Lexer("class Box {\n"
+                         "    void open() {}\n"
+                         "    // Returns the value.\n"
+                         "    public Map<String, T> getValue(int x) {\n"
+                         "        return null;\n"
+                         "    }\n"
+                         "    public List<? extends T> getItems() {\n"
+                         "        return null;\n"
+                         "    }\n"
+                         "}\n").get_comments()
+        self.assertEqual(comments, [("3:5", "// Returns the value.", "function", "getValue")])
+
+    def test_java_missing(self):
+        missing = Lexer("/* License */\n"
+                        "class Box {\n"
+                        "    void open() {}\n"
+                        "    public List<? extends T> getItems() {\n"
+                        "        return null;\n"
+                        "    }\n"
+                        "}\n").get_missing_comments()
+        self.assertEqual(missing, [("2:1", "Box", "class"), ("4:5", "getItems", "function")])
+
+    def test_cpp_missing(self):
+        missing = Lexer("/* License */\n"
+                        "int a() {\n    return 0;\n}\n"
+                        "std::map<int, int> b() {\n    return {};\n}\n"
+                        "std::pair<int, long> c(int x) {\n    return {};\n}\n").get_missing_comments()
+        self.assertEqual(missing, [("2:1", "a", "function"), ("5:1", "b", "function"), ("8:1", "c", "function")])
+
+
+if __name__ == '__main__':
+    unittest.main()
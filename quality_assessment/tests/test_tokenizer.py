@@ -0,0 +1,84 @@
+"""
+Copyright (c) 2021 Tim Moser.
+
+This file is part of coality
+(see https://github.com/TimDeanMoser/coality).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Tests of the tokenizer's counts-only mode. Run from the root of the repository.
+
+Example:
+    $ python -m pytest quality_assessment/tests
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from quality_assessment.src.tokenizer import Tokenizer
+
+SENTENCES = {"": 0,
+             "Returns the value": 1,
+             "Returns the value of the parser.": 1,
+             "Returns the value. Raises an exception when the parser is closed.": 2,
+             "Why is this here? Because the compiler needs it!": 2,
+             "Really?! Yes, remove it.": 2,
+             "wait... Then call close": 1,
+             "Written by J. Smith for the parser": 1,
+             "Opens the file . Reads every line. then closes it": 3,
+             "The list is empty. Add an item first! Or not?": 3,
+             "Call Dr. Smith for details.": 1,
+             "Use foo, bar, etc. to configure it.": 1,
+             "Returns the value vs. the default.": 1,
+             "Ask Mr. Smith. He wrote it.": 2}
+"""Preprocessed comment texts and the number of sentences NLTK's punkt finds in them"""
+
+
+def get_counts(text: str, counts_only: bool) -> tuple:
+    """
+    Tokenize a text.
+
+    Args:
+        text: Preprocessed comment text
+        counts_only: Mode of the tokenizer
+
+    Returns:
+        Number of sentences, words, syllables and complex words
+    """
+    comment = SimpleNamespace(processed_text=text)
+    Tokenizer(counts_only).get_stats(comment)
+    return comment.n_sentences, comment.n_words, comment.n_syllables, comment.n_complex_words
+
+
+class TestCountsOnly(unittest.TestCase):
+    """Counting only needs no NLTK data and finds the sentences punkt finds in common comment texts."""
+
+    def test_sentences(self):
+        for text, expected in SENTENCES.items():
+            with self.subTest(text=text):
+                self.assertEqual(get_counts(text, True)[0], expected)
+
+    def test_no_lists(self):
+        comment = SimpleNamespace(processed_text="Returns the value. Raises an exception when the parser is closed.")
+        Tokenizer(True).get_stats(comment)
+        self.assertEqual((comment.n_words, comment.n_syllables, comment.n_complex_words), (11, 18, 1))
+        self.assertIsNone(comment.sentences)
+        self.assertIsNone(comment.syllables)
+        self.assertIsNone(comment.complex_words)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,6 +14,8 @@ $env:PYTHONPATH += $env:PYTHONPATH+";"+$PROJECT_PATH
 pip install -r requirements.txt
 python -m nltk.downloader stopwords
 python -m nltk.downloader punkt
+python -m nltk.downloader wordnet
+python quality_assessment/src/synonym_lexicon.py
 Invoke-WebRequest $SRC_ML_URL -OutFile $SRC_ML
 & $SRC_ML
 # Train models
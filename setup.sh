@@ -22,6 +22,8 @@ export PYTHONPATH="${PYTHONPATH}:/$PROJECT_PATH"
 pip install -r requirements.txt
 python3 -m nltk.downloader stopwords
 python3 -m nltk.downloader punkt
+python3 -m nltk.downloader wordnet
+python3 quality_assessment/src/synonym_lexicon.py
 wget $SRC_ML
 dpkg -i srcml_1.0.0-1_ubuntu20.04.deb
 